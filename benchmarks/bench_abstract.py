@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+'''
+    Parity and speed of _parse_abstract_retrieval on large author-group papers
+
+    Parses synthetic consortium papers (fixtures.consortium_abstract) and
+    unusual author groups (fixtures.edge_case_abstracts) with the current
+    parser and with the one of before the rewrite (legacy), and checks that
+    they agree:
+
+        - every field is identical, authors and their affiliations included,
+          except Affiliations (the distinct affiliations of the document);
+        - Affiliations lists the same affiliations, in numeric author order,
+          once each. The legacy parser sorted seq ids as strings ('10' before
+          '2') and could lose an affiliation to colliding dedupe keys: those
+          are reported, not counted as mismatches.
+
+    Then times both on growing papers.
+
+        python benchmarks/bench_abstract.py [--authors 100 1000 3000 5000]
+
+    Exits with status 1 on a mismatch.
+'''
+
+import argparse, sys, time
+
+import fixtures
+import legacy
+
+from timing import best_time
+
+from pyscopus.utils import _parse_abstract_retrieval, _author_group_affiliation
+
+PARITY_PAPERS = [(n_authors, n_groups, collaboration, seed)
+                 for seed, (n_authors, n_groups) in enumerate([(1, 1), (3, 1), (3, 2), (9, 3),
+                                                               (12, 5), (40, 12), (250, 60),
+                                                               (1200, 150)])
+                 for collaboration in (False, True)]
+
+def expected_affiliations(response):
+    # distinct affiliation texts of the authors, in numeric author order
+    author_group = response['abstracts-retrieval-response']['item']['bibrecord']['head']['author-group']
+    if not isinstance(author_group, list):
+        author_group = [author_group]
+    by_seq = dict()
+    text = ''
+    for group in author_group:
+        if 'collaboration' in group:
+            continue
+        if 'affiliation' in group:
+            text = _author_group_affiliation(group['affiliation']) or ''
+        author_list = group.get('author', [])
+        for author in author_list if isinstance(author_list, list) else [author_list]:
+            by_seq.setdefault(int(author['@seq']), []).append(text)
+    distinct = dict()
+    for seq in sorted(by_seq):
+        distinct.update(dict.fromkeys(by_seq[seq]))
+    return '; '.join(distinct)
+
+def messages(exception_list):
+    return [item for item in exception_list
+            if isinstance(item, str) and item.startswith('Exception happened')]
+
+def compare(response):
+    '''
+        (mismatched fields, legacy Affiliations issues) of the two parsers
+    '''
+    new = _parse_abstract_retrieval(response)
+    old = legacy._parse_abstract_retrieval(response)
+    mismatch_list = []
+    for field in sorted(set(old) | set(new)):
+        if field == 'Affiliations':
+            continue
+        if field == 'System Exception':
+            if messages(old.get(field, [])) != messages(new.get(field, [])):
+                mismatch_list.append(field)
+        elif old.get(field) != new.get(field):
+            mismatch_list.append(field)
+    if new['Affiliations'] != expected_affiliations(response):
+        mismatch_list.append('Affiliations')
+    legacy_issue_list = []
+    if old['Affiliations'] is not None:
+        old_set = set(old['Affiliations'].split('; '))
+        new_set = set(new['Affiliations'].split('; '))
+        if not old_set <= new_set:
+            mismatch_list.append('Affiliations (legacy has more)')
+        if old_set < new_set:
+            legacy_issue_list.append('lost %d' %len(new_set - old_set))
+        elif old['Affiliations'] != new['Affiliations']:
+            legacy_issue_list.append('string order')
+    return mismatch_list, legacy_issue_list
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--authors', type=int, nargs='+', default=[100, 1000, 3000, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max', type=int, default=5000,
+                        help='Largest paper the legacy parser is timed on')
+    args = parser.parse_args()
+
+    response_list = fixtures.edge_case_abstracts() + [
+        fixtures.consortium_abstract(n_authors, n_groups, collaboration=collaboration, seed=seed)
+        for n_authors, n_groups, collaboration, seed in PARITY_PAPERS]
+    n_mismatched = n_lost = n_reordered = 0
+    for i, response in enumerate(response_list):
+        mismatch_list, legacy_issue_list = compare(response)
+        if mismatch_list:
+            print('document %d differs: %s' %(i, ', '.join(mismatch_list)))
+            n_mismatched += 1
+        n_lost += any(issue.startswith('lost') for issue in legacy_issue_list)
+        n_reordered += 'string order' in legacy_issue_list
+    print('parity: %d documents, %d mismatched; legacy Affiliations lost entries in %d '
+          'and were in string order in %d' %(len(response_list), n_mismatched,
+                                             n_lost, n_reordered))
+
+    print('%8s %8s %12s %12s %8s' %('authors', 'groups', 'parse (s)', 'legacy (s)', 'speedup'))
+    for n_authors in args.authors:
+        response = fixtures.consortium_abstract(n_authors, max(1, n_authors//10), seed=n_authors)
+        new = best_time(lambda: _parse_abstract_retrieval(response), args.repeat,
+                        clock=time.process_time)
+        old = None
+        if n_authors <= args.legacy_max:
+            old = best_time(lambda: legacy._parse_abstract_retrieval(response), args.repeat,
+                            clock=time.process_time)
+        print('%8d %8d %12.4f %12s %8s' %(n_authors, max(1, n_authors//10), new,
+                                         '%.4f' %old if old is not None else '-',
+                                         '%.0fx' %(old/new) if old is not None and new > 0 else '-'))
+    return 1 if n_mismatched > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
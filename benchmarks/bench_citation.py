@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+'''
+    Parity and scaling of _parse_citation with the number of documents
+
+    Parses synthetic Citation Overview responses (fixtures.citation_response)
+    of growing size, checks that the counts are those of the parser of before
+    the rewrite (legacy, which kept them as strings), and fits the exponent of
+    time ~ documents**k, which is about 1 for linear growth. The legacy parser,
+    which appended a row at a time and copied the frame on every append, is
+    timed alongside on the smaller responses.
+
+        python benchmarks/bench_citation.py [--documents 1250 2500 5000 10000]
+
+    Exits with status 1 on a mismatch, or if the exponent of _parse_citation
+    exceeds --max-exponent.
+'''
+
+import argparse, sys
+
+import pandas as pd
+
+import fixtures
+import legacy
+
+from timing import best_time, exponent
+
+from pyscopus.utils import _parse_citation
+
+YEAR_RANGE = (2010, 2020)
+
+def same_counts(response):
+    new = _parse_citation(response, YEAR_RANGE)
+    old = legacy._parse_citation(response, YEAR_RANGE)
+    return (list(new.columns) == list(old.columns) and
+            new['scopus_id'].tolist() == old['scopus_id'].tolist() and
+            new.iloc[:, 1:].equals(old.iloc[:, 1:].apply(pd.to_numeric).astype('Int64')))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--documents', type=int, nargs='+', default=[1250, 2500, 5000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-exponent', type=float, default=1.25)
+    parser.add_argument('--legacy-max', type=int, default=2500,
+                        help='Largest response the legacy parser is timed on')
+    args = parser.parse_args()
+
+    status = 0
+    if not same_counts(fixtures.citation_response(200, YEAR_RANGE)):
+        print('parity: _parse_citation and the legacy parser disagree')
+        status = 1
+    else:
+        print('parity: same counts as the legacy parser on 200 documents')
+
+    sizes = []
+    new_times = []
+    legacy_times = []
+    print('%10s %12s %12s' %('documents', 'parse (s)', 'legacy (s)'))
+    for n_docs in args.documents:
+        response = fixtures.citation_response(n_docs, YEAR_RANGE)
+        sizes.append(n_docs)
+        new_times.append(best_time(lambda: _parse_citation(response, YEAR_RANGE), args.repeat))
+        old = None
+        if n_docs <= args.legacy_max:
+            old = best_time(lambda: legacy._parse_citation(response, YEAR_RANGE), 1)
+            legacy_times.append(old)
+        print('%10d %12.4f %12s' %(n_docs, new_times[-1], '%.3f' %old if old is not None else '-'))
+
+    k = exponent(sizes, new_times)
+    print('_parse_citation exponent: %.2f' %k)
+    if len(legacy_times) > 1:
+        print('legacy exponent: %.2f' %exponent(sizes[:len(legacy_times)], legacy_times))
+    if k > args.max_exponent:
+        print('_parse_citation does not scale linearly (exponent %.2f > %.2f)'
+              %(k, args.max_exponent))
+        status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+    Import time of pyscopus, and the heavy dependencies it must not import
+
+    Imports pyscopus in fresh interpreters and reports the time it takes. Every
+    run also checks that pandas, numpy, requests and aiohttp are still missing
+    from sys.modules afterwards: they are imported on first use.
+
+        python benchmarks/bench_import.py [--runs 10]
+
+    Exits with status 1 if one of them was imported, or if the median import
+    time exceeds --max-ms.
+'''
+
+import argparse, json, os, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ('pandas', 'numpy', 'requests', 'aiohttp')
+
+CHILD = '''
+import json, sys, time
+t = time.perf_counter()
+import pyscopus
+elapsed = time.perf_counter() - t
+print(json.dumps({'ms': elapsed*1000,
+                  'imported': [name for name in %r if name in sys.modules]}))
+''' %(HEAVY,)
+
+def import_once():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    output = subprocess.check_output([sys.executable, '-c', CHILD], cwd=ROOT, env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=200.)
+    args = parser.parse_args()
+
+    # the first run compiles the .pyc files: not counted
+    import_once()
+    result_list = [import_once() for _ in range(args.runs)]
+    times = sorted(result['ms'] for result in result_list)
+    median = times[len(times)//2]
+    imported = sorted(set(name for result in result_list for name in result['imported']))
+    print('import pyscopus: median %.1f ms, min %.1f ms, max %.1f ms over %d runs'
+          %(median, times[0], times[-1], len(times)))
+    print('heavy modules imported: %s' %(', '.join(imported) if imported else 'none'))
+    status = 0
+    if imported:
+        print('importing pyscopus must not import %s' %', '.join(imported))
+        status = 1
+    if median > args.max_ms:
+        print('import takes %.1f ms, more than %.1f ms' %(median, args.max_ms))
+        status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
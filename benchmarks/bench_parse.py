@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+    Speed and parity of search entry parsing: records accumulated column by
+    column (_RecordColumns) against a pandas.Series per entry
+
+    Parses decoded search pages (fixtures.search_entry, fixtures.author_entry),
+    so that only parsing and building the data frame are timed, with the
+    current parser and with the one of before the rewrite (legacy: a Series
+    per entry and a data frame per page, concatenated once at the end here
+    so that page accumulation, see bench_search.py, is left out). Checks that
+    both give the same data frame.
+
+        python benchmarks/bench_parse.py [--entries 10000]
+
+    Exits with status 1 on a mismatch.
+'''
+
+import argparse, sys
+
+import pandas as pd
+
+import fixtures
+import legacy
+
+from timing import best_time
+
+from pyscopus.utils import _parse_search_page, _RecordColumns
+
+def pages_of(entry, n_entries):
+    return [{'search-results': {'opensearch:totalResults': str(n_entries),
+                                'entry': [entry(i) for i in range(start, min(start+25, n_entries))]}}
+            for start in range(0, n_entries, 25)]
+
+def parse(page_list, type_):
+    columns = _RecordColumns()
+    for js in page_list:
+        columns.extend(_parse_search_page(js, type_)[0])
+    return columns.to_frame()
+
+def parse_legacy(page_list, type_):
+    parse_entry = legacy._parse_article if type_ == 1 else legacy._parse_author
+    return pd.concat([pd.DataFrame([parse_entry(entry) for entry in js['search-results']['entry']])
+                      for js in page_list], ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    status = 0
+    print('%10s %8s %12s %12s %8s' %('search', 'entries', 'parse (s)', 'legacy (s)', 'speedup'))
+    for name, type_, entry in (('document', 1, fixtures.search_entry),
+                               ('author', 2, fixtures.author_entry)):
+        page_list = pages_of(entry, args.entries)
+        new = parse(page_list, type_)
+        old = parse_legacy(page_list, type_)
+        # Cover Date came after the rewrite
+        if not old.equals(new.drop(columns=['Cover Date'], errors='ignore')):
+            print('%s search: the parsers give different data frames' %name)
+            status = 1
+        new_time = best_time(lambda: parse(page_list, type_), args.repeat)
+        old_time = best_time(lambda: parse_legacy(page_list, type_), args.repeat)
+        print('%10s %8d %12.3f %12.3f %7.1fx' %(name, args.entries, new_time, old_time,
+                                              old_time/new_time))
+    if status == 0:
+        print('parity: same data frames')
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+    Scaling of Scopus.search with the number of records
+
+    Times search for growing counts against canned responses (no network) and
+    fits the exponent of time ~ count**k: k is about 1 when the results are
+    built once, about 2 when every page copies what was fetched before. The
+    search of before the rewrite (legacy.search) is timed alongside.
+
+        python benchmarks/bench_search.py [--counts 625 1250 2500 5000]
+
+    Exits with status 1 if the exponent of Scopus.search exceeds --max-exponent.
+'''
+
+import argparse, sys
+
+import fixtures
+import legacy
+
+from timing import best_time, exponent
+
+from pyscopus import Scopus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--counts', type=int, nargs='+', default=[625, 1250, 2500, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-exponent', type=float, default=1.25)
+    parser.add_argument('--no-legacy', action='store_true', help='Do not time legacy.search')
+    args = parser.parse_args()
+
+    scopus = Scopus('benchmark', transport=fixtures.CannedTransport(max(args.counts)),
+                    rate_limiter=fixtures.unthrottled())
+
+    new_times = []
+    legacy_times = []
+    print('%8s %12s %12s' %('count', 'search (s)', 'legacy (s)'))
+    for count in args.counts:
+        # the first search encodes the canned pages it needs: not timed
+        scopus.search('benchmark', count=count)
+        new_times.append(best_time(lambda: scopus.search('benchmark', count=count), args.repeat))
+        if not args.no_legacy:
+            legacy_times.append(best_time(lambda: legacy.search(scopus._fetch, 'benchmark', count),
+                                          args.repeat))
+        print('%8d %12.3f %12s' %(count, new_times[-1],
+                                  '%.3f' %legacy_times[-1] if legacy_times else '-'))
+
+    k = exponent(args.counts, new_times)
+    print('search exponent: %.2f' %k)
+    if legacy_times:
+        print('legacy exponent: %.2f' %exponent(args.counts, legacy_times))
+    if k > args.max_exponent:
+        print('search does not scale linearly (exponent %.2f > %.2f)' %(k, args.max_exponent))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+'''
+    Behaviour checks of the api key pool, retries, caches, archive and sink
+
+    Runs deterministic scenarios against scripted responses (no network) and
+    temporary files: round-robin key order, failover when a key runs out of
+    quota or is refused, QuotaExceeded once every key is used up, 429
+    backoff, LRU eviction, TTL expiry, archive reindexing after a truncated
+    write and ParquetSink schema conformance (skipped without pyarrow).
+
+        python benchmarks/checks.py [--only quota_failover ttl_expiry]
+
+    Exits with status 1 if a check fails.
+'''
+
+import argparse, gzip, json, os, shutil, sys, tempfile, time, traceback, warnings
+
+import fixtures
+
+from pyscopus import APIURI, Scopus
+from pyscopus.archive import ResponseArchive
+from pyscopus.cache import LRUCache, ResponseCache
+from pyscopus.keypool import KeyPool, QuotaExceeded
+from pyscopus.lazy import lazy_import
+from pyscopus.ratelimit import RateLimiter
+from pyscopus.transport import ScopusHTTPError
+
+ABSTRACT_URL = '%s/%s' %(APIURI.ABSTRACT, '1')
+BODY = b'{"abstracts-retrieval-response": {}}'
+
+class Skipped(Exception):
+    pass
+
+def ok(content=BODY, headers=None):
+    return fixtures.CannedResponse(content, headers=headers)
+
+def quota_exceeded(reset):
+    return fixtures.CannedResponse(b'{}', status_code=429,
+                                   headers={'X-RateLimit-Remaining': '0',
+                                            'X-RateLimit-Reset': str(reset),
+                                            'X-ELS-Status': 'QUOTA_EXCEEDED - Quota Exceeded'})
+
+def client(respond, keys):
+    transport = fixtures.ScriptedTransport(respond)
+    return Scopus(keys, transport=transport, rate_limiter=fixtures.unthrottled()), transport
+
+def expect_raise(exception, function):
+    try:
+        function()
+    except exception as e:
+        return e
+    raise AssertionError('%s not raised' %exception.__name__)
+
+def check_round_robin():
+    pool = KeyPool(['a', 'b', 'c'])
+    order = [pool.get('abstract') for _ in range(6)]
+    assert order == ['a', 'b', 'c', 'a', 'b', 'c'], order
+    pool.add('b')
+    assert len(pool) == 3, pool.keys
+
+def check_quota_failover():
+    # key a runs out of quota: its request goes again with b, and later ones skip a
+    reset = time.time() + 3600
+    scopus, transport = client(lambda url, params: quota_exceeded(reset) if params['apikey'] == 'a'
+                               else ok(headers={'X-RateLimit-Remaining': '10'}), ['a', 'b'])
+    assert scopus.retrieve_abstract('1', raw=True) == BODY
+    assert scopus.retrieve_abstract('1', raw=True) == BODY
+    assert transport.keys() == ['a', 'b', 'b'], transport.keys()
+    assert scopus.key_pool.remaining('abstract') == {'a': 0, 'b': 10}
+
+def check_rejected_failover():
+    # a 401 for key a goes again with b, and a is skipped for every endpoint after that
+    def respond(url, params):
+        if params['apikey'] == 'a':
+            return fixtures.CannedResponse(b'{}', status_code=401)
+        return ok()
+    scopus, transport = client(respond, ['a', 'b'])
+    assert scopus.retrieve_abstract('1', raw=True) == BODY
+    assert transport.keys() == ['a', 'b'], transport.keys()
+    assert scopus.key_pool.rejected('a', 'search')
+    # refused by every key: the request fails with the API's error, once
+    scopus, transport = client(lambda url, params: fixtures.CannedResponse(b'{}', status_code=401),
+                               ['a', 'b'])
+    e = expect_raise(ScopusHTTPError, lambda: scopus.retrieve_abstract('1', raw=True))
+    assert e.status_code == 401 and not isinstance(e, QuotaExceeded), e
+    assert len(transport.calls) == 2, transport.keys()
+
+def check_quota_exhausted():
+    # every key out of quota, with a reset still to come or already past (a
+    # stale header): QuotaExceeded after one request per key
+    for reset in (time.time() + 3600, time.time() - 3600):
+        scopus, transport = client(lambda url, params: quota_exceeded(reset), ['a', 'b'])
+        e = expect_raise(QuotaExceeded, lambda: scopus.retrieve_abstract('1', raw=True))
+        assert e.endpoint == 'abstract', e.endpoint
+        assert sorted(transport.keys()) == ['a', 'b'], transport.keys()
+    # without any key
+    scopus, transport = client(lambda url, params: quota_exceeded(time.time() + 3600), None)
+    expect_raise(QuotaExceeded, lambda: scopus.retrieve_abstract('1', raw=True))
+    assert len(transport.calls) == 1, transport.calls
+
+def check_backoff():
+    # throttled responses are retried with the same key, max_retries times at most
+    def throttled(url, params):
+        return fixtures.CannedResponse(b'{}', status_code=429, headers={'Retry-After': '0'})
+    responses = [throttled, throttled, lambda url, params: ok()]
+    scopus, transport = client(lambda url, params: responses.pop(0)(url, params), ['a'])
+    scopus.rate_limiter = RateLimiter(max_retries=5)
+    assert scopus.retrieve_abstract('1', raw=True) == BODY
+    assert transport.keys() == ['a', 'a', 'a'], transport.keys()
+    scopus, transport = client(throttled, ['a'])
+    scopus.rate_limiter = RateLimiter(max_retries=2)
+    e = expect_raise(ScopusHTTPError, lambda: scopus.retrieve_abstract('1', raw=True))
+    assert e.status_code == 429, e
+    assert len(transport.calls) == 3, transport.calls
+
+def check_lru_eviction(path):
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache and 'b' not in cache and 'c' in cache
+    assert cache.info() == {'hits': 1, 'misses': 0, 'size': 2, 'maxsize': 2}, cache.info()
+    # bodies of 100 bytes in at most 250: the least recently used one goes
+    cache = ResponseCache(os.path.join(path, 'cache.sqlite'), max_size=250)
+    try:
+        for sid in ('1', '2'):
+            cache.put('abstract', ABSTRACT_URL, {'sid': sid}, ok(b'x'*100))
+            time.sleep(.01)
+        assert cache.get('abstract', ABSTRACT_URL, {'sid': '1'}) is not None
+        cache.put('abstract', ABSTRACT_URL, {'sid': '3'}, ok(b'x'*100))
+        kept = [sid for sid in ('1', '2', '3')
+                if cache.get('abstract', ABSTRACT_URL, {'sid': sid}) is not None]
+        assert kept == ['1', '3'], kept
+    finally:
+        cache.close()
+
+def check_ttl_expiry(path):
+    cache = ResponseCache(os.path.join(path, 'cache.sqlite'), ttls={'abstract': 3600})
+    try:
+        # the api key is not part of the cache key
+        cache.put('abstract', ABSTRACT_URL, {'apikey': 'a', 'view': 'FULL'}, ok())
+        r = cache.get('abstract', ABSTRACT_URL, {'apikey': 'b', 'view': 'FULL'})
+        assert r is not None and r.content == BODY
+        cache.put('abstract', ABSTRACT_URL, {'view': 'META'},
+                  fixtures.CannedResponse(b'{}', status_code=404))
+        assert cache.get('abstract', ABSTRACT_URL, {'view': 'META'}) is None
+        cache.ttls['abstract'] = 0
+        time.sleep(.01)
+        assert cache.get('abstract', ABSTRACT_URL, {'view': 'FULL'}) is None
+        cache.expire()
+        cache.ttls['abstract'] = None
+        assert cache.get('abstract', ABSTRACT_URL, {'view': 'FULL'}) is None
+    finally:
+        cache.close()
+    # a cached response is served without any request
+    cache = ResponseCache(os.path.join(path, 'cache.sqlite'))
+    try:
+        scopus, transport = client(lambda url, params: ok(), ['a'])
+        scopus.cache = cache
+        scopus.retrieve_abstract('1', raw=True)
+        scopus.retrieve_abstract('1', raw=True)
+        assert len(transport.calls) == 1, transport.calls
+    finally:
+        cache.close()
+
+def check_archive_reindex(path):
+    path = os.path.join(path, 'archive')
+    with ResponseArchive(path) as archive:
+        archive.put('abstract', '1', b'{"n": 1}')
+        archive.put('abstract', '2', b'{"n":\n 2}')
+        archive.put('abstract', '1', b'{"n": 3}')
+        assert archive.get('abstract', '1') == {'n': 3}
+        shard_path = archive.locations()[0][2]
+    # a write cut short: half a gzip member at the end of the shard
+    member = gzip.compress(b'{"kind": "abstract", "id": "4", "response": {"n": 4}}\n')
+    with open(shard_path, 'ab') as f:
+        f.write(member[:len(member)//2])
+    os.remove(os.path.join(path, 'index.sqlite'))
+    with ResponseArchive(path) as archive:
+        assert len(archive) == 0
+        n = archive.reindex()
+        assert n == 3, n
+        assert sorted(archive.ids('abstract')) == ['1', '2'], archive.ids('abstract')
+        assert archive.get('abstract', '1') == {'n': 3}
+        assert archive.get('abstract', '2') == {'n': 2}
+        assert ('abstract', '4') not in archive
+
+def check_parquet_sink(path):
+    pa = lazy_import('pyarrow')
+    if pa is None:
+        raise Skipped('pyarrow is not installed')
+    from pyarrow import parquet as pq
+    from pyscopus.sink import ParquetSink
+    schema = pa.schema([('id', pa.string()), ('Year', pa.int16()), ('Cover Date', pa.date32())])
+    path = os.path.join(path, 'records.parquet')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        with ParquetSink(path, schema=schema, batch_size=2) as sink:
+            sink.write([{'id': 1, 'Year': '2020', 'Cover Date': '2020-01-31'},
+                        {'id': 'b', 'Year': 'n/a', 'Cover Date': 'soon', 'extra': 1},
+                        {'Year': 1999}])
+    assert sum('extra' in str(w.message) for w in caught) == 1, [str(w.message) for w in caught]
+    table = pq.read_table(path)
+    assert table.schema.equals(schema), table.schema
+    assert sink.rows == 3, sink.rows
+    rows = table.to_pylist()
+    assert [row['id'] for row in rows] == ['1', 'b', None], rows
+    assert [row['Year'] for row in rows] == [2020, None, 1999], rows
+    assert [str(row['Cover Date']) for row in rows] == ['2020-01-31', 'None', 'None'], rows
+
+CHECKS = [('round_robin', check_round_robin, False),
+          ('quota_failover', check_quota_failover, False),
+          ('rejected_failover', check_rejected_failover, False),
+          ('quota_exhausted', check_quota_exhausted, False),
+          ('backoff', check_backoff, False),
+          ('lru_eviction', check_lru_eviction, True),
+          ('ttl_expiry', check_ttl_expiry, True),
+          ('archive_reindex', check_archive_reindex, True),
+          ('parquet_sink', check_parquet_sink, True)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--only', nargs='+', choices=[name for name, _, _ in CHECKS])
+    args = parser.parse_args()
+
+    failed = []
+    for name, check, needs_path in CHECKS:
+        if args.only and name not in args.only:
+            continue
+        path = tempfile.mkdtemp(prefix='pyscopus-check-')
+        try:
+            check(path) if needs_path else check()
+            print('%-20s ok' %name)
+        except Skipped as e:
+            print('%-20s skipped (%s)' %(name, e))
+        except Exception:
+            print('%-20s FAILED' %name)
+            traceback.print_exc()
+            failed.append(name)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    if failed:
+        print('%i check(s) failed: %s' %(len(failed), ', '.join(failed)))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+'''
+    Synthetic Scopus responses and an in-memory transport for the benchmarks
+
+    Importing this module puts the working copy of pyscopus first on sys.path,
+    so the benchmarks measure the tree they are run from.
+'''
+
+import copy, json, os, random, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyscopus import APIURI
+from pyscopus.ratelimit import RateLimiter, DEFAULT_BUDGETS
+
+def search_entry(i):
+    '''
+        Document search entry (COMPLETE view) number i: a few authors with
+        affiliations, ISSNs, open access labels. Some entries lack fields or
+        give them in another shape, as real ones do.
+    '''
+    n_authors = 2 + i % 6
+    entry = {'eid': '2-s2.0-%d' %(85000000000+i),
+            'dc:identifier': 'SCOPUS_ID:%d' %(85000000000+i),
+            'pubmed-id': str(30000000+i),
+            'dc:title': 'Synthetic document %d on topic %d' %(i, i % 97),
+            'prism:publicationName': 'Journal %d' %(i % 211),
+            'prism:issn': [{'$': '%04d%04d' %(i % 211, 1000 + i % 7)}, {'$': '1234567X'}],
+            'prism:volume': str(1 + i % 40),
+            'prism:issueIdentifier': str(1 + i % 12),
+            'prism:pageRange': '%d-%d' %(1 + i % 300, 11 + i % 300),
+            'prism:coverDate': '%d-%02d-%02d' %(1990 + i % 33, 1 + i % 12, 1 + i % 28),
+            'prism:doi': '10.1000/synthetic.%d' %i,
+            'citedby-count': str(i % 500),
+            'prism:aggregationType': 'Journal',
+            'subtypeDescription': 'Article',
+            'article-number': str(i),
+            'freetoreadLabel': {'value': [{'$': 'All Open Access'}, {'$': 'Gold'}]},
+            'author': [{'authid': str(7000000000 + (i*7 + a*13) % 50000), '@seq': str(a+1),
+                        'authname': 'Author%d A.' %((i*7 + a*13) % 50000),
+                        'surname': 'Author%d' %((i*7 + a*13) % 50000), 'given-name': 'A.',
+                        'initials': 'A.',
+                        'afid': [{'$': str(60000000 + (i + a) % 900)}]}
+                       for a in range(n_authors)],
+            'affiliation': [{'afid': str(60000000 + (i + a) % 900),
+                             'affilname': 'University %d' %((i + a) % 900),
+                             'affiliation-city': 'City %d' %((i + a) % 50),
+                             'affiliation-country': 'Country %d' %((i + a) % 20)}
+                            for a in range(n_authors)]}
+    if i % 11 == 5:
+        del entry['prism:doi']
+    if i % 13 == 7:
+        del entry['prism:pageRange']
+    if i % 17 == 3:
+        entry['prism:issn'] = '87654321'
+    if i % 19 == 2:
+        entry['prism:isbn'] = [{'$': '978%010d' %i}, {'$': '979%010d' %i}]
+    if i % 23 == 11:
+        del entry['freetoreadLabel']
+        del entry['pubmed-id']
+    return entry
+
+def author_entry(i):
+    '''
+        Author search entry number i, with or without a current affiliation
+    '''
+    entry = {'dc:identifier': 'AUTHOR_ID:%d' %(7000000000+i),
+             'preferred-name': {'surname': 'Author%d' %i, 'given-name': 'Given%d' %(i % 300)},
+             'document-count': str(1 + i % 150)}
+    if i % 9 != 4:
+        entry['affiliation-current'] = {'affiliation-name': 'University %d' %(i % 900),
+                                        'affiliation-id': str(60000000 + i % 900)}
+    return entry
+
+def search_page(start, n, total, cursor=False):
+    '''
+        Decoded search response of entries start..start+n (at most total)
+    '''
+    entries = [search_entry(i) for i in range(start, min(start+n, total))]
+    if len(entries) == 0:
+        entries = [{'error': 'Result set was empty'}]
+    js = {'search-results': {'opensearch:totalResults': str(total), 'entry': entries}}
+    if cursor:
+        js['search-results']['cursor'] = {'@current': str(start), '@next': str(start+n)}
+    return js
+
+class CannedResponse(object):
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+
+    def json(self):
+        return json.loads(self.content)
+
+class CannedTransport(object):
+    '''
+        Transport answering document searches with pages of total synthetic
+        entries (see search_entry). Pages are encoded once and then served
+        from memory, so a benchmark measures pyscopus and not the fixtures.
+    '''
+
+    def __init__(self, total):
+        self.total = total
+        self._pages = dict()
+
+    def get(self, url, params=None, headers=None):
+        if url != APIURI.SEARCH:
+            raise ValueError('CannedTransport only serves document search, not %s' %url)
+        params = params if params is not None else {}
+        cursor = params.get('cursor')
+        if cursor is not None:
+            start = 0 if cursor == '*' else int(cursor)
+        else:
+            start = int(params.get('start', 0))
+        key = (start, cursor is not None)
+        if key not in self._pages:
+            self._pages[key] = json.dumps(search_page(start, 25, self.total,
+                                                      cursor=cursor is not None)).encode()
+        return CannedResponse(self._pages[key])
+
+    def close(self):
+        pass
+
+class ScriptedTransport(object):
+    '''
+        Transport answering every request with respond(url, params), a
+        CannedResponse, and keeping the (url, params) of each request in
+        calls. Gives up after max_calls requests, so that a client retrying
+        without end fails instead of hanging.
+    '''
+
+    def __init__(self, respond, max_calls=50):
+        self.respond = respond
+        self.max_calls = max_calls
+        self.calls = []
+
+    def get(self, url, params=None, headers=None):
+        params = dict(params) if params is not None else {}
+        self.calls.append((url, params))
+        if len(self.calls) > self.max_calls:
+            raise RuntimeError('%i requests sent, the client keeps retrying' %len(self.calls))
+        return self.respond(url, params)
+
+    def keys(self):
+        '''
+            Api key of every request sent, in order
+        '''
+        return [params.get('apikey', params.get('apiKey')) for _, params in self.calls]
+
+    def close(self):
+        pass
+
+def abstract_response(sid, author_group=None):
+    '''
+        Decoded abstract retrieval response (FULL view) of document sid, with
+        two authors in two groups unless author_group is given
+    '''
+    if author_group is None:
+        author_group = [{'affiliation': {'ce:source-text': 'University A, City A'},
+                         'author': [{'@seq': '1', 'ce:indexed-name': 'Doe J.'}]},
+                        {'affiliation': {'ce:source-text': 'University B, City B'},
+                         'author': [{'@seq': '2', 'ce:indexed-name': 'Roe R.'},
+                                    {'@seq': '1', 'ce:indexed-name': 'Doe J.'}]}]
+    return {'abstracts-retrieval-response': {
+        'coredata': {'eid': '2-s2.0-%s' %sid, 'dc:identifier': 'SCOPUS_ID:%s' %sid,
+                     'dc:title': 'Document %s' %sid, 'prism:publicationName': 'Journal',
+                     'dc:description': 'Abstract of document %s' %sid,
+                     'prism:coverDate': '2020-01-01', 'citedby-count': '3'},
+        'item': {'bibrecord': {'head': {
+            'source': {'sourcetitle-abbrev': 'J.', 'codencode': 'JJJJ'},
+            'citation-info': {'author-keywords': {'author-keyword': [{'$': 'alpha'},
+                                                                     {'$': 'beta'}]}},
+            'author-group': author_group}}}}}
+
+def _group_affiliation(rnd, institution):
+    # one of the shapes author-group affiliations come in
+    return rnd.choice([
+        {'ce:source-text': 'Institute %d, Somewhere' %institution},
+        {'organization': [{'$': 'Department %d' %(institution % 7)},
+                          {'$': 'University %d' %institution}],
+         'city': 'City %d' %institution, 'country': 'Country'},
+        {'organization': {'$': 'Laboratory %d' %institution},
+         'postalcode': '0%d' %institution, 'country': 'Country'},
+        {'ce:text': 'Affiliation %d' %institution}])
+
+def consortium_abstract(n_authors, n_groups, n_institutions=None, collaboration=True, seed=0):
+    '''
+        Abstract retrieval response of a large author-group paper, as physics
+        and genomics consortia publish: n_authors spread over n_groups author
+        groups (one per affiliation), a fifth of them in two or three groups,
+        institutions shared by several groups, and optionally a collaboration
+        group first. Deterministic for a given seed.
+    '''
+    rnd = random.Random(seed)
+    if n_institutions is None:
+        n_institutions = max(1, n_groups//2)
+    group_list = [{'affiliation': _group_affiliation(rnd, rnd.randrange(n_institutions)),
+                   'author': []} for _ in range(n_groups)]
+    for seq in range(1, n_authors+1):
+        n_memberships = rnd.choice((1, 1, 1, 1, 1, 1, 1, 1, 2, 3)) if n_groups >= 3 else 1
+        for group in rnd.sample(group_list, n_memberships):
+            group['author'].append({'@seq': str(seq), 'ce:indexed-name': 'Author%d A.' %seq})
+    group_list = [group for group in group_list if len(group['author']) > 0]
+    if collaboration:
+        group_list.insert(0, {'collaboration': {'ce:indexed-name': 'Synthetic Collaboration'}})
+    return abstract_response('7%d' %seed, group_list)
+
+def edge_case_abstracts():
+    '''
+        Abstract responses with unusual author groups: authors out of order or
+        missing, single (non-list) authors and groups, groups without
+        affiliation or authors, collaborations given by text
+    '''
+    base = abstract_response('42')
+    case_list = [base]
+    for author_group in (
+            [{'affiliation': {'ce:text': 'T'},
+              'author': [{'@seq': '1', 'ce:indexed-name': 'A'}, {'@seq': '3', 'ce:indexed-name': 'C'}]},
+             {'author': [{'@seq': '2', 'ce:indexed-name': 'B'}]}],
+            [{'affiliation': {'foo': 1}, 'author': {'@seq': '1', 'ce:indexed-name': 'A'}},
+             {'affiliation': {'ce:text': 'T'}},
+             {'collaboration': {'ce:text': 'C1'}},
+             {'collaboration': {'ce:indexed-name': 'C2'}}],
+            [{'affiliation': {'ce:text': 'T'},
+              'author': [{'@seq': '1', 'ce:indexed-name': 'A'}, {'@seq': '2', 'ce:indexed-name': 'B'}]},
+             {'affiliation': {'ce:text': 'U'}, 'author': [{'@seq': '2', 'ce:indexed-name': 'B'}]}],
+            {'affiliation': {'ce:source-text': 'Only group'},
+             'author': [{'@seq': '1', 'ce:indexed-name': 'A'}, {'@seq': '2', 'ce:indexed-name': 'B'}]}):
+        case = copy.deepcopy(base)
+        case['abstracts-retrieval-response']['item']['bibrecord']['head']['author-group'] = author_group
+        case_list.append(case)
+    return case_list
+
+def citation_response(n_docs, year_range=(2010, 2020)):
+    '''
+        Decoded Citation Overview response of n_docs documents with counts for
+        every year of year_range (inclusive)
+    '''
+    n_year = year_range[1] - year_range[0] + 1
+    cite_info_list = [{'dc:identifier': 'SCOPUS_ID:%d' %(85000000000+i),
+                       'pcc': str(i % 13),
+                       'cc': [{'$': str((i*7 + k) % 31)} for k in range(n_year)],
+                       'lcc': str(i % 5),
+                       'rowTotal': str(i % 13 + sum((i*7 + k) % 31 for k in range(n_year)) + i % 5)}
+                      for i in range(n_docs)]
+    return {'abstract-citations-response': {'citeInfoMatrix': {'citeInfoMatrixXML': {
+        'citationMatrix': {'citeInfo': cite_info_list}}}}}
+
+def unthrottled():
+    '''
+        RateLimiter that never waits, for benchmarks against canned responses
+    '''
+    return RateLimiter({endpoint: 1e9 for endpoint in DEFAULT_BUDGETS})
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+'''
+    Timing helpers shared by the benchmarks
+'''
+
+import math, time
+
+def best_time(function, repeat, clock=time.perf_counter):
+    '''
+        Shortest of repeat timings of function() on clock
+    '''
+    best = None
+    for _ in range(repeat):
+        t = clock()
+        function()
+        elapsed = clock() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def exponent(sizes, times):
+    '''
+        Exponent k of times ~ sizes**k: least squares slope of log(time)
+        against log(size). About 1 for linear growth, 2 for quadratic.
+    '''
+    x_list = [math.log(size) for size in sizes]
+    y_list = [math.log(t) for t in times]
+    x_mean = sum(x_list)/len(x_list)
+    y_mean = sum(y_list)/len(y_list)
+    return sum((x-x_mean)*(y-y_mean) for x, y in zip(x_list, y_list)) / \
+           sum((x-x_mean)**2 for x in x_list)
@@ -1,5 +1,4 @@
-import os.path
 from pyscopus.scopus import Scopus
-from pkg_resources import get_distribution, DistributionNotFound
+from pyscopus.async_scopus import AsyncScopus
 
 __version__ = '1.0.3a2'
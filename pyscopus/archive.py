@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+'''
+    Append-only archive of raw Scopus responses in compressed JSONL shards
+'''
+
+import gzip, json, os, re, sqlite3, threading, time, zlib
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS record (
+        kind TEXT NOT NULL,
+        id TEXT NOT NULL,
+        shard INTEGER NOT NULL,
+        offset INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        stored_at REAL NOT NULL,
+        PRIMARY KEY (kind, id)
+    );
+'''
+
+_SHARD_NAME = 'shard-%05i.jsonl.gz'
+_SHARD_RE = re.compile(r'^shard-(\d{5})\.jsonl\.gz$')
+
+_RESPONSE_SEP = b', "response": '
+
+def _line(kind, id_, content):
+    # one JSONL line wrapping the response body as is; newlines can only be
+    # whitespace between JSON tokens (they are escaped within strings)
+    content = content.replace(b'\r', b' ').replace(b'\n', b' ')
+    head = '{"kind": %s, "id": %s' %(json.dumps(kind), json.dumps(id_))
+    return head.encode('utf-8') + _RESPONSE_SEP + content + b'}\n'
+
+def _split_line(line):
+    # (head, response body) of a line; kind and id are JSON strings, in which
+    # a quote is always escaped, so the first separator ends them
+    i = line.index(_RESPONSE_SEP)
+    return line[:i] + b'}', line[i+len(_RESPONSE_SEP):-2]
+
+def read_record(shard_path, offset, size, f=None):
+    '''
+        Response body (bytes) of the archive line at offset (of size bytes) in a
+        shard, read from the open file f if given
+    '''
+    if f is None:
+        with open(shard_path, 'rb') as f:
+            return read_record(shard_path, offset, size, f)
+    f.seek(offset)
+    return _split_line(gzip.decompress(f.read(size)))[1]
+
+def _iter_members(f):
+    # (offset, size, data) of every gzip member of a file, stopping at a truncated tail
+    offset = 0
+    buf = b''
+    while True:
+        d = zlib.decompressobj(wbits=31)
+        data = []
+        consumed = 0
+        while not d.eof:
+            if len(buf) == 0:
+                buf = f.read(2**20)
+                if len(buf) == 0:
+                    return
+            data.append(d.decompress(buf))
+            consumed += len(buf) - len(d.unused_data)
+            buf = d.unused_data
+        yield offset, consumed, b''.join(data)
+        offset += consumed
+
+class ResponseArchive(object):
+    '''
+        Archive of raw responses, keyed by kind (the endpoint: 'abstract',
+        'author', ...) and id (scopus id, author id, ...).
+
+        Responses are appended, as received, to gzip-compressed JSONL shards in
+        one directory; each line is {"kind": ..., "id": ..., "response": {...}}.
+        Every line is a gzip member of its own, so a shard reads as plain JSONL
+        with zcat while a SQLite index of (shard, offset, size) by kind and id
+        gives random access to any response. Storing an id again appends the new
+        response and the index points to it.
+
+        Pass it to Scopus/AsyncScopus (archive=...) to archive every retrieval.
+        One process at a time may write to an archive.
+
+        Parameters
+        ----------
+        path : str
+            Archive directory. Created if missing.
+        shard_size : int
+            Size in bytes beyond which a new shard is started.
+        compresslevel : int
+            gzip compression level, 1 (fastest) to 9 (smallest).
+    '''
+
+    def __init__(self, path, shard_size=2**28, compresslevel=6):
+        self.path = path
+        self.shard_size = shard_size
+        self.compresslevel = compresslevel
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # the index can be rebuilt from the shards: no need to sync it on every commit
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        shard_list = self.shards()
+        self._shard = shard_list[-1] if len(shard_list) > 0 else 0
+        self._file = open(self._shard_path(self._shard), 'ab')
+        self._readers = dict()
+
+    def _shard_path(self, shard):
+        return os.path.join(self.path, _SHARD_NAME %shard)
+
+    def shards(self):
+        '''
+            Numbers of the shards in the archive directory, in order
+        '''
+        return sorted(int(m.group(1)) for m in map(_SHARD_RE.match, os.listdir(self.path))
+                      if m is not None)
+
+    def put(self, kind, id_, content):
+        '''
+            Append a response body (JSON bytes) for id_ of kind
+        '''
+        id_ = str(id_)
+        member = gzip.compress(_line(kind, id_, content), compresslevel=self.compresslevel,
+                               mtime=0)
+        with self._lock:
+            offset = self._file.tell()
+            if offset > 0 and offset + len(member) > self.shard_size:
+                self._file.close()
+                self._shard += 1
+                self._file = open(self._shard_path(self._shard), 'ab')
+                offset = 0
+            self._file.write(member)
+            self._file.flush()
+            self._conn.execute('INSERT OR REPLACE INTO record VALUES (?, ?, ?, ?, ?, ?)',
+                               (kind, id_, self._shard, offset, len(member), time.time()))
+            self._conn.commit()
+
+    def _read(self, shard, offset, size):
+        with self._lock:
+            if shard not in self._readers:
+                self._readers[shard] = open(self._shard_path(shard), 'rb')
+            f = self._readers[shard]
+            f.seek(offset)
+            member = f.read(size)
+        return _split_line(gzip.decompress(member))[1]
+
+    def get_raw(self, kind, id_):
+        '''
+            Latest response body (bytes) archived for id_ of kind, None if there is none
+        '''
+        id_ = str(id_)
+        with self._lock:
+            row = self._conn.execute('SELECT shard, offset, size FROM record '
+                                     'WHERE kind = ? AND id = ?', (kind, id_)).fetchone()
+        if row is None:
+            return None
+        return self._read(*row)
+
+    def get(self, kind, id_, decoder=json.loads):
+        '''
+            Latest response archived for id_ of kind, decoded, None if there is none
+        '''
+        content = self.get_raw(kind, id_)
+        return None if content is None else decoder(content)
+
+    def __contains__(self, key):
+        kind, id_ = key
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM record WHERE kind = ? AND id = ?',
+                                      (kind, str(id_))).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM record').fetchone()[0]
+
+    def ids(self, kind):
+        '''
+            Ids archived for kind
+        '''
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT id FROM record WHERE kind = ?',
+                                                         (kind,))]
+
+    def locations(self, kind=None):
+        '''
+            (kind, id, shard path, offset, size) of the latest response of every id
+            (of kind, or of all kinds), in shard order. See read_record.
+        '''
+        with self._lock:
+            if kind is None:
+                row_list = self._conn.execute('SELECT kind, id, shard, offset, size FROM record '
+                                              'ORDER BY shard, offset').fetchall()
+            else:
+                row_list = self._conn.execute('SELECT kind, id, shard, offset, size FROM record '
+                                              'WHERE kind = ? ORDER BY shard, offset',
+                                              (kind,)).fetchall()
+        return [(kind_, id_, self._shard_path(shard), offset, size)
+                for kind_, id_, shard, offset, size in row_list]
+
+    def iter_raw(self, kind=None):
+        '''
+            Yield (kind, id, response body) of the latest response of every id (of
+            kind, or of all kinds), reading each shard sequentially
+        '''
+        f = None
+        for kind_, id_, shard_path, offset, size in self.locations(kind):
+            if f is None or f.name != shard_path:
+                if f is not None:
+                    f.close()
+                f = open(shard_path, 'rb')
+            yield kind_, id_, read_record(shard_path, offset, size, f)
+        if f is not None:
+            f.close()
+
+    def reindex(self):
+        '''
+            Rebuild the index from the shards (e.g. after copying shards from
+            another archive). Returns the number of responses indexed.
+        '''
+        with self._lock:
+            self._conn.execute('DELETE FROM record')
+            n = 0
+            for shard in self.shards():
+                with open(self._shard_path(shard), 'rb') as f:
+                    for offset, size, line in _iter_members(f):
+                        head = json.loads(_split_line(line)[0])
+                        self._conn.execute('INSERT OR REPLACE INTO record VALUES (?, ?, ?, ?, ?, ?)',
+                                           (head['kind'], head['id'], shard, offset, size,
+                                            time.time()))
+                        n += 1
+            self._conn.commit()
+        return n
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            for f in self._readers.values():
+                f.close()
+            self._readers.clear()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
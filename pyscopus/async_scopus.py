@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+import warnings, os
+from pyscopus import APIURI
+from pyscopus.scopus import OFFSET_LIMIT, CITATION_CHUNK_SIZE
+from pyscopus.transport import DEFAULT_HEADERS, Response, default_json_decoder
+from pyscopus.ratelimit import RateLimiter
+from pyscopus.keypool import KeyPool
+from pyscopus.request import _Request
+from pyscopus.frame import typed_frame
+from pyscopus.tables import _LinkColumns
+from pyscopus.lazy import LazyModule, lazy_import
+from pyscopus.utils import _parse_author_retrieval, _parse_citation,\
+        _parse_abstract_retrieval, _search_request, _parse_search_page,\
+        _search_archive_key, _parse_serial, _parse_aff, _RecordColumns
+
+asyncio = LazyModule('asyncio')
+pd = LazyModule('pandas')
+aiohttp = lazy_import('aiohttp')
+
+def _save_response(download_path, scopus_id, content):
+    # several abstracts may be saved at once, so creating the folder must not race
+    os.makedirs(download_path, exist_ok=True)
+    with open(os.path.join(download_path, scopus_id+'.json'), 'wb') as f:
+        f.write(content)
+
+class AsyncScopus(object):
+    '''
+        asyncio counterpart of Scopus, built on aiohttp.
+
+        Every method is a coroutine with the same arguments and results as the
+        Scopus method of the same name. Requests never block the event loop and
+        at most `concurrency` of them are in flight at a time, however many
+        coroutines are gathered.
+
+        Use it as an async context manager, or call close() when done:
+
+            async with AsyncScopus(key) as scopus:
+                abstract_list = await asyncio.gather(*[scopus.retrieve_abstract(sid)
+                                                       for sid in scopus_id_list])
+    '''
+
+    def __init__(self, apikey=None, concurrency=10, timeout=30, session=None,
+                 rate_limiter=None, key_pool=None, cache=None, json_decoder=None,
+                 archive=None):
+        '''
+            Parameters
+            ----------
+            apikey : str or list
+                Elsevier api key, or several keys to spread requests over.
+            concurrency : int
+                Maximum number of requests in flight at a time.
+            timeout : float
+                Total timeout (seconds) of each request.
+            session : aiohttp.ClientSession
+                Session to issue requests with. By default one is created on first use
+                (and closed by close()).
+            rate_limiter : pyscopus.ratelimit.RateLimiter
+                Throttle, possibly shared with other (sync or async) clients.
+                Default is a RateLimiter with the standard per-endpoint throttles.
+            key_pool : pyscopus.keypool.KeyPool
+                Pool of api keys, possibly shared with other clients. By default
+                a pool of the key(s) given as apikey.
+            cache : pyscopus.cache.ResponseCache
+                Persistent response cache. Default is None (no caching).
+            json_decoder : callable
+                Function decoding a response body (bytes) into Python objects.
+                Default is orjson.loads if orjson is installed, json.loads otherwise.
+            archive : pyscopus.archive.ResponseArchive
+                Archive of raw retrieval and search responses (see Scopus). Default is None.
+        '''
+        if aiohttp is None:
+            raise ImportError('AsyncScopus requires aiohttp (pip install aiohttp)')
+        if key_pool is None:
+            if apikey is None:
+                key_pool = KeyPool()
+            elif isinstance(apikey, str):
+                key_pool = KeyPool([apikey])
+            else:
+                key_pool = KeyPool(apikey)
+        self.key_pool = key_pool
+        self.apikey = key_pool.keys[0] if len(key_pool) > 0 else None
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = session
+        self._own_session = session is None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        if json_decoder is None:
+            json_decoder = default_json_decoder()
+        self.json_decoder = json_decoder
+        self.archive = archive
+
+    def add_key(self, apikey):
+        self.key_pool = KeyPool([apikey])
+        self.apikey = apikey
+
+    def add_pool_key(self, apikey):
+        self.key_pool.add(apikey)
+        if self.apikey is None:
+            self.apikey = apikey
+
+    def _get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 headers=DEFAULT_HEADERS,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and self._own_session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _blocking(self, function, *args):
+        # run a blocking call (SQLite, file I/O) on the loop's default executor,
+        # so that it does not hold up the other requests
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    async def _request(self, url, params, archive_key=None):
+        request = _Request(url, params, self.key_pool, self.rate_limiter, self.cache,
+                           self.archive, archive_key)
+        if self.cache is not None:
+            r = await self._blocking(request.cached)
+            if r is not None:
+                return r
+        session = self._get_session()
+        while True:
+            key = request.next_key()
+            # wait for the limiter before taking a slot, so waiting does not hold one
+            await self.rate_limiter.acquire_async(request.endpoint, key)
+            async with self._semaphore:
+                async with session.get(url, params=request.params) as resp:
+                    r = Response(resp.status, resp.headers, await resp.read())
+            if request.done(r):
+                break
+        if self.cache is not None or request.archive is not None:
+            await self._blocking(request.store, r)
+        return r
+
+    async def _fetch(self, url, params, archive_key=None):
+        r = await self._request(url, params, archive_key)
+        return self.json_decoder(r.content)
+
+    async def _search_page(self, query, type_, view, index=0, cursor=None, links=False):
+        url, par = _search_request(self.apikey, query, type_, view, index=index, cursor=cursor)
+        archive_key = _search_archive_key(query, type_, index=index, cursor=cursor)
+        return _parse_search_page(await self._fetch(url, par, archive_key), type_, links=links)
+
+    async def search(self, query, count=100, type_=1, view='COMPLETE', cursor=None, typed=False,
+                     tables=False):
+        '''
+            Search for documents matching the keywords in query (see Scopus.search).
+            Once the total is known, all remaining pages are requested concurrently.
+
+            Returns
+            -------
+            pandas.DataFrame
+               Data frame of search results (a dict of data frames with tables).
+        '''
+
+        if type(count) is not int:
+            raise ValueError("%s is not a valid input for the number of entries to return." %count)
+
+        is_document = type_ == 1 or type_ == 'article'
+        if cursor and not is_document:
+            raise ValueError("Cursor pagination is only available for document search.")
+        if tables:
+            if not is_document:
+                raise ValueError("tables are only available for document search.")
+            if view != 'COMPLETE':
+                warnings.warn("The %s view has no authors: tables will be empty (use view='COMPLETE')"
+                              %view, UserWarning)
+        auto_cursor = cursor is None
+        if auto_cursor:
+            cursor = is_document and count > OFFSET_LIMIT
+
+        record_list, total_count, next_cursor = await self._search_page(
+                query, type_, view, cursor='*' if cursor else None, links=tables)
+
+        if total_count <= count:
+            count = total_count
+        if auto_cursor and count <= OFFSET_LIMIT:
+            cursor = False
+
+        if count > 25 and cursor:
+            while len(record_list) < count and next_cursor is not None:
+                page, _, next_cursor = await self._search_page(query, type_, view,
+                                                               cursor=next_cursor, links=tables)
+                if len(page) == 0:
+                    break
+                record_list.extend(page)
+        elif count > 25:
+            page_list = await asyncio.gather(*[self._search_page(query, type_, view, index=index,
+                                                                 links=tables)
+                                               for index in range(25, count, 25)])
+            for page, _, _ in page_list:
+                record_list.extend(page)
+
+        if tables:
+            link_columns = _LinkColumns()
+            for doc, (_, links) in enumerate(record_list[:count]):
+                link_columns.add(doc, links)
+            df = _RecordColumns([record for record, _ in record_list[:count]]).to_frame()
+            return link_columns.to_frames(typed_frame(df, type_) if typed else df)
+        df = _RecordColumns(record_list[:count]).to_frame()
+        return typed_frame(df, type_) if typed else df
+
+    async def search_author(self, query, view='STANDARD', count=10, typed=False):
+        return await self.search(query, count, type_=2, view=view, typed=typed)
+
+    async def search_author_publication(self, author_id, count=10000, typed=False, tables=False):
+        query = 'au-id(%s)'%author_id
+        return await self.search(query, count, typed=typed, tables=tables)
+
+    async def retrieve_author(self, author_id):
+        par = {'apikey': self.apikey, 'httpAccept': 'application/json'}
+        js = await self._fetch('%s/%s'%(APIURI.AUTHOR, author_id), par, ('author', author_id))
+        try:
+            return _parse_author_retrieval(js)
+        except:
+            raise ValueError('Author %s not found!' %author_id)
+
+    async def retrieve_abstract(self, scopus_id, download_path=None, view='FULL', raw=False):
+        par = {'apikey': self.apikey, 'httpAccept': 'application/json', 'view': view}
+        r = await self._request('%s/%s'%(APIURI.ABSTRACT, scopus_id), par, ('abstract', scopus_id))
+
+        if download_path is not None:
+            await self._blocking(_save_response, download_path, scopus_id, r.content)
+        if raw:
+            return r.content
+
+        js = self.json_decoder(r.content)
+
+        try:
+            return _parse_abstract_retrieval(js)
+        except:
+            raise ValueError("API Response Header is %s"%r.headers)
+
+    async def _retrieve_abstract_record(self, scopus_id, download_path=None, view='FULL'):
+        try:
+            abstract_dict = await self.retrieve_abstract(scopus_id, download_path=download_path,
+                                                         view=view)
+            abstract_dict['Retrieval Error'] = None
+        except Exception as e:
+            abstract_dict = {'Retrieval Error': '%s: %s' %(type(e).__name__, e)}
+        abstract_dict['scopus_id'] = scopus_id
+        return abstract_dict
+
+    async def retrieve_abstracts(self, scopus_ids, download_path=None, view='FULL'):
+        '''
+            Retrieve many abstracts concurrently (see Scopus.retrieve_abstracts);
+            concurrency is bounded by the client's semaphore.
+        '''
+        abstract_list = await asyncio.gather(*[self._retrieve_abstract_record(scopus_id,
+                                                                              download_path=download_path,
+                                                                              view=view)
+                                               for scopus_id in scopus_ids])
+        return pd.DataFrame(abstract_list)
+
+    async def retrieve_citation(self, scopus_id_array, year_range,
+                                chunk_size=CITATION_CHUNK_SIZE):
+        date = '%i-%i' %(year_range[0], year_range[1])
+        scopus_id_array = [str(scopus_id) for scopus_id in scopus_id_array]
+
+        async def fetch_chunk(start):
+            chunk_ids = scopus_id_array[start:start+chunk_size]
+            chunk = ','.join(chunk_ids)
+            par = {'apikey': self.apikey, 'scopus_id': chunk,
+                   'httpAccept':'application/json', 'date': date}
+            js = await self._fetch(APIURI.CITATION, par, ('citation', '%s:%s' %(date, chunk)))
+            return _parse_citation(js, year_range, chunk_ids)
+
+        chunk_list = await asyncio.gather(*[fetch_chunk(start) for start in
+                                            range(0, len(scopus_id_array), chunk_size)])
+        if len(chunk_list) == 0:
+            return pd.DataFrame()
+        return pd.concat(chunk_list, ignore_index=True)
+
+    async def retrieve_full_text(self, full_text_link):
+        js = await self._fetch(full_text_link, {'apikey': self.apikey,
+                                                'httpAccept': 'application/json'},
+                               ('full_text', full_text_link))
+        return js['full-text-retrieval-response']['originalText']
+
+    async def search_serial(self, title, view='CITESCORE', count=200):
+        if type(count) != int or count > 200:
+            warnings.warn("count corrected to be 200", UserWarning)
+            count = 200
+        if view not in ['STANDARD', 'ENHANCED', 'CITESCORE']:
+            warnings.warn("view corrected to be CITESCORE", UserWarning)
+            view = 'CITESCORE'
+        par = {'apiKey': self.apikey, 'title': title,
+                'count': count, 'view': view}
+        return _parse_serial(await self._fetch(APIURI.SERIAL_SEARCH, par))
+
+    async def retrieve_serial(self, issn, view='CITESCORE'):
+        if view not in ['STANDARD', 'ENHANCED', 'CITESCORE']:
+            warnings.warn("view corrected to be CITESCORE", UserWarning)
+            view = 'CITESCORE'
+        par = {'apiKey': self.apikey, 'view': view}
+        archive_key = ('serial', '%s|%s' %(issn, view))
+        return _parse_serial(await self._fetch(APIURI.SERIAL_RETRIEVAL+issn, par, archive_key))
+
+    async def retrieve_affiliation(self, aff_id, view='STANDARD'):
+        par = {'apiKey': self.apikey, 'view': view, 'httpAccept': 'application/json'}
+        archive_key = ('affiliation', '%s|%s' %(aff_id, view))
+        js = await self._fetch(APIURI.AFFL_RETRIEVAL+aff_id, par, archive_key)
+        d = _parse_aff(js['affiliation-retrieval-response'])
+        d['aff_id'] = aff_id
+        return d
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+'''
+    Caches for Scopus API responses (on disk) and parsed entities (in memory)
+'''
+
+import collections, hashlib, json, sqlite3, threading, time
+
+from pyscopus.transport import Response
+
+DAY = 24*3600
+# How long responses stay fresh, in seconds, by endpoint (see ratelimit.endpoint_of)
+DEFAULT_TTLS = {'search': DAY, 'search_author': DAY, 'citation': DAY,
+                'author': 7*DAY, 'abstract': 30*DAY, 'serial': 30*DAY,
+                'affiliation': 30*DAY, 'other': 7*DAY}
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS response (
+        key TEXT PRIMARY KEY,
+        endpoint TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        headers TEXT NOT NULL,
+        content BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        stored_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS response_accessed_at ON response (accessed_at);
+'''
+
+def cache_key(endpoint, url, params):
+    '''
+        Cache key of a request: endpoint, url and sorted params, api key excluded
+    '''
+    par = sorted((k, str(v)) for k, v in (params or {}).items()
+                 if k.lower() != 'apikey' and v is not None)
+    return hashlib.sha1(json.dumps([endpoint, url, par]).encode('utf-8')).hexdigest()
+
+class ResponseCache(object):
+    '''
+        SQLite-backed cache of successful responses, keyed on endpoint, url and
+        normalized params (never the api key), so a warm re-run costs no requests.
+
+        Parameters
+        ----------
+        path : str
+            SQLite database file. Created if missing.
+        ttls : dict
+            Seconds a response stays fresh, by endpoint, merged over DEFAULT_TTLS.
+            None as a value means it never expires.
+        max_size : int
+            Maximum total size of cached bodies in bytes. Least recently used
+            responses are evicted beyond it. None for no limit.
+    '''
+
+    def __init__(self, path='scopus_cache.sqlite', ttls=None, max_size=2**30):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM response').fetchone()[0]
+
+    def get(self, endpoint, url, params):
+        '''
+            Cached Response of a request, or None if missing or expired
+        '''
+        key = cache_key(endpoint, url, params)
+        with self._lock:
+            row = self._conn.execute('SELECT status, headers, content, stored_at FROM response '
+                                     'WHERE key = ?', (key,)).fetchone()
+            ttl = self.ttls.get(endpoint, self.ttls['other'])
+            if row is None or (ttl is not None and row[3]+ttl < time.time()):
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE response SET accessed_at = ? WHERE key = ?',
+                               (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return Response(row[0], json.loads(row[1]), row[2])
+
+    def put(self, endpoint, url, params, response):
+        '''
+            Store a successful response (anything with status_code, headers and content)
+        '''
+        if response.status_code != 200:
+            return
+        key = cache_key(endpoint, url, params)
+        content = response.content
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM response WHERE key = ?', (key,)).fetchone()
+            self._conn.execute('INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (key, endpoint, response.status_code,
+                                json.dumps(dict(response.headers)), content, len(content), now, now))
+            self._size += len(content) - (old[0] if old is not None else 0)
+            if self.max_size is not None and self._size > self.max_size:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # drop least recently used responses until 10% below the limit
+        target = self.max_size*.9
+        for key, size in self._conn.execute('SELECT key, size FROM response '
+                                            'ORDER BY accessed_at').fetchall():
+            if self._size <= target:
+                break
+            self._conn.execute('DELETE FROM response WHERE key = ?', (key,))
+            self._size -= size
+
+    def expire(self):
+        '''
+            Delete every expired response
+        '''
+        now = time.time()
+        with self._lock:
+            for endpoint, ttl in self.ttls.items():
+                if ttl is None:
+                    continue
+                self._conn.execute('DELETE FROM response WHERE endpoint = ? AND stored_at < ?',
+                                   (endpoint, now-ttl))
+            self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM response').fetchone()[0]
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM response')
+            self._conn.commit()
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class LRUCache(object):
+    '''
+        Thread-safe, size-bounded in-memory LRU mapping with hit/miss counters.
+
+        Parameters
+        ----------
+        maxsize : int
+            Maximum number of entries kept; the least recently used one is dropped
+            beyond it.
+    '''
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.maxsize is not None and self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        '''
+            Dictionary of hits, misses, current size and maxsize
+        '''
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._data), 'maxsize': self.maxsize}
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+'''
+    Sparse co-authorship graphs of search results
+'''
+
+from pyscopus.lazy import LazyModule, lazy_import
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+# None if scipy is not installed
+sparse = LazyModule('scipy.sparse') if lazy_import('scipy') is not None else None
+csgraph = LazyModule('scipy.sparse.csgraph')
+
+def _split_author_ids(values):
+    # (document number, author id string) of every author of '; '-joined
+    # Authors_ID values, document number being the position in values
+    doc_list = []
+    id_list = []
+    for doc, authors_id in enumerate(values):
+        if isinstance(authors_id, str) and len(authors_id) > 0:
+            parts = authors_id.split('; ')
+            doc_list.extend([doc]*len(parts))
+            id_list.extend(parts)
+    return doc_list, id_list
+
+def _as_int64(ids):
+    # author ids as an int64 array and a mask of the valid ones
+    try:
+        return np.array(ids, dtype=np.int64), None
+    except (ValueError, TypeError, OverflowError):
+        ids = pd.to_numeric(pd.Series(ids, dtype=object), errors='coerce')
+        valid = ids.notna().to_numpy()
+        return ids[valid].to_numpy(dtype=np.int64), valid
+
+class CoauthorGraph(object):
+    '''
+        Co-authorship graph of a set of documents as sparse matrices:
+
+            incidence : author x document CSR matrix, 1 where the author signed
+                the document
+            coauthorship : author x author CSR matrix of the number of documents
+                two authors signed together (incidence times its transpose,
+                with an empty diagonal)
+
+        Authors are numbered 0..n_authors-1 in the order of their Scopus ids
+        (author_ids maps a number to its id, codes an id to its number), and
+        documents by their position in the search results.
+
+        Build it from search results with CoauthorGraph.from_search. Needs scipy.
+
+        Parameters
+        ----------
+        doc : array of int
+            Document number of every authorship.
+        author_id : array of int or str
+            Scopus author id of every authorship.
+        n_docs : int
+            Number of documents (some may have no authors). Default is the
+            largest document number plus one.
+        max_authors : int
+            Leave documents with more authors than this out of coauthorship
+            (but not incidence): a 3000-author paper adds 9 million pairs of
+            collaborators. Default is None (keep all).
+    '''
+
+    def __init__(self, doc, author_id, n_docs=None, max_authors=None):
+        if sparse is None:
+            raise ImportError('CoauthorGraph requires scipy (pip install scipy)')
+        doc = np.asarray(doc, dtype=np.int64)
+        author_id, valid = _as_int64(author_id)
+        if valid is not None:
+            doc = doc[valid]
+        if n_docs is None:
+            n_docs = int(doc.max()) + 1 if len(doc) > 0 else 0
+        self.n_docs = n_docs
+        self.author_ids, codes = np.unique(author_id, return_inverse=True)
+        incidence = sparse.csr_matrix((np.ones(len(doc), dtype=np.int32), (codes, doc)),
+                                      shape=(len(self.author_ids), n_docs))
+        # an author listed twice on a document still signed it once
+        incidence.sum_duplicates()
+        incidence.data[:] = 1
+        self.incidence = incidence
+        self.papers = np.diff(incidence.indptr)
+        if max_authors is not None:
+            kept = np.diff(incidence.tocsc().indptr) <= max_authors
+            incidence = incidence[:, np.flatnonzero(kept)]
+        coauthorship = (incidence @ incidence.T).tocsr()
+        coauthorship.setdiag(0)
+        coauthorship.eliminate_zeros()
+        self.coauthorship = coauthorship
+
+    @classmethod
+    def from_search(cls, results, max_authors=None):
+        '''
+            Graph of the documents of search results, which may be:
+
+                - the dict of data frames of search(..., tables=True), whose
+                  authorships are used as they are
+                - a data frame of search results (its Authors_ID column)
+                - an iterable of parsed records or pages (lists of records), as
+                  iter_search yields them, consumed in one pass
+
+            Document numbers follow the order of the results.
+        '''
+        if isinstance(results, dict) and 'authorships' in results:
+            authorships = results['authorships']
+            valid = authorships['author_id'].notna().to_numpy()
+            return cls(authorships['doc'].to_numpy()[valid],
+                       authorships['author_id'].to_numpy()[valid].astype(np.int64),
+                       n_docs=len(results['documents']), max_authors=max_authors)
+        if isinstance(results, pd.DataFrame):
+            values = results['Authors_ID'].tolist()
+        else:
+            values = []
+            for item in results:
+                if isinstance(item, list):
+                    values.extend([record.get('Authors_ID') for record in item])
+                else:
+                    values.append(item.get('Authors_ID'))
+        doc_list, id_list = _split_author_ids(values)
+        return cls(doc_list, id_list, n_docs=len(values), max_authors=max_authors)
+
+    @property
+    def n_authors(self):
+        return len(self.author_ids)
+
+    def codes(self, author_ids):
+        '''
+            Numbers of Scopus author ids (int or str); ValueError for an author
+            not in the graph
+        '''
+        ids = np.atleast_1d(np.asarray(author_ids)).astype(np.int64)
+        codes = np.searchsorted(self.author_ids, ids)
+        found = codes < len(self.author_ids)
+        found[found] = self.author_ids[codes[found]] == ids[found]
+        if not found.all():
+            raise ValueError('Authors not in the graph: %s' %', '.join(map(str, ids[~found])))
+        return codes
+
+    def degree(self, weighted=False):
+        '''
+            Number of distinct collaborators of every author (or, weighted, the
+            sum over collaborators of the documents signed together)
+
+            Returns
+            -------
+            pandas.Series
+                Indexed by author id.
+        '''
+        if weighted:
+            values = np.asarray(self.coauthorship.sum(axis=1)).ravel()
+        else:
+            values = np.diff(self.coauthorship.indptr)
+        return pd.Series(values, index=pd.Index(self.author_ids, name='author_id'),
+                         name='degree')
+
+    def components(self):
+        '''
+            Connected component of every author, numbered by decreasing size
+            (0 is the largest component)
+
+            Returns
+            -------
+            pandas.Series
+                Indexed by author id.
+        '''
+        _, labels = csgraph.connected_components(self.coauthorship, directed=False)
+        order = np.argsort(-np.bincount(labels), kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        return pd.Series(rank[labels], index=pd.Index(self.author_ids, name='author_id'),
+                         name='component')
+
+    def top_collaborators(self, author_ids=None, k=10):
+        '''
+            The k most frequent collaborators of authors (all of them by
+            default), ties broken by author id
+
+            Returns
+            -------
+            pandas.DataFrame
+                author_id, collaborator_id, papers (signed together), sorted by
+                author then decreasing papers.
+        '''
+        if author_ids is None:
+            codes = np.arange(self.n_authors)
+            rows = self.coauthorship
+        else:
+            codes = self.codes(author_ids)
+            rows = self.coauthorship[codes]
+        # sort the entries of every row by decreasing count and keep the first k
+        row = np.repeat(np.arange(rows.shape[0]), np.diff(rows.indptr))
+        order = np.lexsort((rows.indices, -rows.data, row))
+        rank = np.arange(len(order)) - rows.indptr[row]
+        order = order[rank < k]
+        return pd.DataFrame({'author_id': self.author_ids[codes[row[order]]],
+                             'collaborator_id': self.author_ids[rows.indices[order]],
+                             'papers': rows.data[order]})
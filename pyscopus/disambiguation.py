@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+'''
+    Author disambiguation: resolving author mentions (a name, with hints such
+    as affiliations, subject areas or co-authors) to Scopus author ids
+'''
+
+import re, unicodedata, warnings
+
+from pyscopus.lazy import LazyModule
+from pyscopus.utils import _search_request, _AUTHOR_CANDIDATE_SCHEMA
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+FEATURES = ('name', 'affiliation', 'subject', 'coauthor')
+
+# words too common in affiliation names to tell two of them apart
+_AFFILIATION_STOPWORDS = frozenset(['and', 'center', 'centre', 'college', 'de', 'del', 'der',
+                                    'department', 'des', 'di', 'dept', 'for', 'fur', 'in',
+                                    'institute', 'la', 'of', 'school', 'the', 'univ',
+                                    'universidad', 'universita', 'universite', 'universitat',
+                                    'university'])
+
+def normalize_name(name):
+    '''
+        Lowercase ASCII words of a name, accents and punctuation removed:
+        'Müller-Lüdenscheidt, J.' -> 'muller ludenscheidt j'
+    '''
+    if not isinstance(name, str):
+        return ''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join([c for c in name if not unicodedata.combining(c)])
+    return ' '.join(re.findall(r'[a-z0-9]+', name.lower()))
+
+def name_key(last, first):
+    '''
+        Blocking key of a name: normalized last name and first initial
+        ('singh, v'), None without a last name. Mentions and candidates with
+        the same key are compared; one author search per key finds the candidates.
+    '''
+    last = normalize_name(last)
+    if len(last) == 0:
+        return None
+    first = normalize_name(first)
+    return '%s, %s' %(last, first[:1]) if len(first) > 0 else last
+
+def _affiliation_words(name):
+    return [word for word in normalize_name(name).split()
+            if len(word) > 1 and word not in _AFFILIATION_STOPWORDS]
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return [x for x in value if x is not None]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [value]
+
+def _first_word(names):
+    return names.fillna('').map(normalize_name).str.split(' ').str[0]
+
+def _coverage(pairs, left, right):
+    # share of the keys of each pair's mention (left: mention, key) that its
+    # candidate has (right: author_id, key); NaN for mentions without keys
+    size = left.groupby('mention').size()
+    hits = (pairs.merge(left, on='mention').merge(right, on=['author_id', 'key'])
+            .groupby(['mention', 'author_id']).size())
+    index = pd.MultiIndex.from_frame(pairs)
+    return (hits.reindex(index, fill_value=0).to_numpy() /
+            size.reindex(pairs['mention']).to_numpy())
+
+def _cosine(pairs, left, right):
+    # cosine of the keys of each pair's mention (left: mention, key, all of
+    # weight 1) and the weighted keys of its candidate (right: author_id, key,
+    # weight); NaN for mentions without keys, 0 for candidates without any
+    dot = (pairs.merge(left, on='mention').merge(right, on=['author_id', 'key'])
+           .groupby(['mention', 'author_id'])['weight'].sum())
+    dot = dot.reindex(pd.MultiIndex.from_frame(pairs), fill_value=0).to_numpy()
+    norm_left = np.sqrt(left.groupby('mention').size()).reindex(pairs['mention']).to_numpy()
+    norm_right = np.sqrt((right['weight']**2).groupby(right['author_id']).sum())
+    norm_right = norm_right.reindex(pairs['author_id']).fillna(0).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = np.where(norm_right > 0, dot/(norm_left*norm_right), 0.)
+    return np.where(np.isnan(norm_left), np.nan, cosine)
+
+class AuthorDisambiguator(object):
+    '''
+        Resolves author mentions to Scopus author ids in bulk.
+
+        A mention is a name (first, last) with any of these hints:
+
+            affiliation_id : Scopus affiliation id(s) of the author
+            affiliation : affiliation name, used when there are no ids
+            subjects : Scopus subject area abbreviations, e.g. ['COMP', 'SOCI']
+            coauthor_ids : Scopus author ids of co-authors
+
+        Mentions are blocked by name_key, and one author search per key (not
+        per mention) fetches the candidates, on `workers` threads. Unless
+        documents is False, the publications of the candidates are then fetched
+        (one document search per candidate, so that a prolific one does not
+        crowd the others out), giving the co-authors and affiliations they
+        published with. Every (mention,
+        candidate) pair of a block is scored at once with data frame joins:
+
+            name : 1 for the same first name, 0.5 if one is the other's initial
+            affiliation : share of the mention's affiliation ids (or affiliation
+                name words) found in the candidate's current and publication
+                affiliations
+            subject : cosine of the mention's subject areas and the candidate's
+                subject areas weighted by document count
+            coauthor : share of the mention's co-authors found among the
+                candidate's co-authors
+
+        The score is the weighted mean of the features the mention has hints for.
+        Author searches and publications are kept for later calls.
+
+        Parameters
+        ----------
+        scopus : pyscopus.Scopus
+            Client the requests go through (with its rate limiter, cache, ...).
+        weights : dict
+            Weight of every feature; missing ones keep DEFAULT_WEIGHTS.
+        max_candidates : int
+            Most candidates taken from the author search of a key (up to 200).
+        workers : int
+            Number of author searches (or document searches) run concurrently.
+        documents : bool
+            Fetch the publications of the candidates for the coauthor and
+            affiliation features (needed for coauthor). Default is True.
+        documents_per_query : int
+            Most publications fetched per candidate.
+    '''
+
+    DEFAULT_WEIGHTS = {'name': 1., 'affiliation': 2., 'subject': 1., 'coauthor': 3.}
+
+    def __init__(self, scopus, weights=None, max_candidates=50, workers=4, documents=True,
+                 documents_per_query=500):
+        self.scopus = scopus
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        if weights is not None:
+            unknown = set(weights) - set(FEATURES)
+            if len(unknown) > 0:
+                raise ValueError('Unknown features: %s' %', '.join(sorted(unknown)))
+            self.weights.update(weights)
+        self.max_candidates = max_candidates
+        self.workers = workers
+        self.documents = documents
+        self.documents_per_query = documents_per_query
+        # key -> candidate records; author id -> (feature, key) rows of its publications
+        self._blocks = dict()
+        self._profiles = dict()
+
+    def _search_block(self, key):
+        last, _, initial = key.partition(', ')
+        query = 'AUTHLASTNAME(%s)' %last
+        if len(initial) > 0:
+            query += ' AND AUTHFIRST(%s)' %initial
+        url, par = _search_request(self.scopus.apikey, query, 2, 'STANDARD')
+        par['count'] = self.max_candidates
+        results = self.scopus._fetch(url, par)['search-results']
+        record_list = [_AUTHOR_CANDIDATE_SCHEMA(entry) for entry in results.get('entry', [])
+                       if 'dc:identifier' in entry]
+        truncated = int(results.get('opensearch:totalResults', 0)) > len(record_list)
+        return record_list, truncated
+
+    def candidates(self, keys):
+        '''
+            Candidates of name keys (see name_key), one author search per key
+            not searched yet
+
+            Returns
+            -------
+            pandas.DataFrame
+                key, author_id, surname, given_name, document_count,
+                affiliation_id, affiliation, city, country, subjects (dict of
+                subject area: document count)
+        '''
+        new_key_list = sorted(set(keys) - set(self._blocks))
+        truncated_list = []
+        for key, (record_list, truncated) in zip(new_key_list,
+                self.scopus._imap(self._search_block, new_key_list, workers=self.workers)):
+            self._blocks[key] = record_list
+            if truncated:
+                truncated_list.append(key)
+        if len(truncated_list) > 0:
+            warnings.warn('Only the first %i candidates were kept for %i names, e.g. %s (raise max_candidates)'
+                          %(self.max_candidates, len(truncated_list), truncated_list[0]), UserWarning)
+        record_list = [dict(record, key=key) for key in set(keys) for record in self._blocks[key]]
+        columns = ['key'] + _AUTHOR_CANDIDATE_SCHEMA.columns
+        return pd.DataFrame(record_list, columns=columns)
+
+    def _search_documents(self, author_id):
+        # one more publication than kept tells whether there were more
+        tables = self.scopus.search('AU-ID(%s)' %author_id, count=self.documents_per_query+1,
+                                    view='COMPLETE', tables=True)
+        truncated = len(tables['documents']) > self.documents_per_query
+        if truncated:
+            for name in ('authorships', 'author_affiliations'):
+                tables[name] = tables[name][tables[name]['doc'] < self.documents_per_query]
+        authorships = tables['authorships'].dropna()
+        authorships = pd.DataFrame({'doc': authorships['doc'].to_numpy(),
+                                    'author_id': authorships['author_id'].astype(str).to_numpy()})
+        own = authorships[authorships['author_id'] == author_id]
+        own = own.rename(columns={'author_id': 'candidate'})
+        coauthors = own.merge(authorships, on='doc')
+        coauthors = coauthors[coauthors['candidate'] != coauthors['author_id']]
+        coauthors = pd.DataFrame({'author_id': coauthors['candidate'], 'feature': 'coauthor',
+                                  'key': coauthors['author_id']})
+        author_affiliations = tables['author_affiliations'].dropna()
+        author_affiliations = author_affiliations[
+                author_affiliations['author_id'].astype(str) == author_id]
+        affiliation_ids = pd.DataFrame({'author_id': author_affiliations['author_id'].astype(str),
+                                        'feature': 'affiliation',
+                                        'key': 'id:' + author_affiliations['affiliation_id'].astype(str)})
+        # affiliation name words, each distinct name split once
+        words = {afid: ['w:' + word for word in _affiliation_words(name)]
+                 for afid, name in zip(tables['affiliations']['affiliation_id'],
+                                       tables['affiliations']['name'])}
+        affiliation_words = pd.DataFrame({'author_id': author_affiliations['author_id'].astype(str),
+                                          'key': author_affiliations['affiliation_id'].map(words)})
+        affiliation_words = affiliation_words.explode('key').dropna().assign(feature='affiliation')
+        profile = pd.concat([coauthors, affiliation_ids, affiliation_words], ignore_index=True)
+        return profile.drop_duplicates(), truncated
+
+    def profiles(self, author_ids):
+        '''
+            (author_id, feature, key) rows of the co-authors ('coauthor') and
+            affiliations ('affiliation': 'id:<affiliation id>' and 'w:<name
+            word>') in the publications of candidates, one document search per
+            candidate not fetched yet
+        '''
+        new_id_list = sorted(set(author_ids) - set(self._profiles))
+        truncated_list = []
+        for author_id, (profile, truncated) in zip(new_id_list,
+                self.scopus._imap(self._search_documents, new_id_list, workers=self.workers)):
+            self._profiles[author_id] = profile
+            if truncated:
+                truncated_list.append(author_id)
+        if len(truncated_list) > 0:
+            warnings.warn('Only the first %i publications were kept for %i candidates, e.g. %s (raise documents_per_query)'
+                          %(self.documents_per_query, len(truncated_list), truncated_list[0]), UserWarning)
+        frame_list = [self._profiles[author_id] for author_id in set(author_ids)]
+        if len(frame_list) == 0:
+            return pd.DataFrame(columns=['author_id', 'feature', 'key'])
+        return pd.concat(frame_list, ignore_index=True)
+
+    def _mention_frame(self, mentions):
+        mentions = pd.DataFrame(mentions).reset_index(drop=True)
+        for column in ('first', 'last'):
+            if column not in mentions.columns:
+                raise ValueError('Mentions need a %s column' %column)
+        mentions['key'] = [name_key(last, first)
+                           for last, first in zip(mentions['last'], mentions['first'])]
+        return mentions
+
+    def _mention_keys(self, mentions):
+        # (mention, feature, key) rows of the hints of every mention
+        row_list = []
+        for column in ('affiliation_id', 'affiliation', 'subjects', 'coauthor_ids'):
+            if column not in mentions.columns:
+                mentions[column] = None
+        for i, afids, affiliation, subjects, coauthor_ids in zip(
+                mentions.index, mentions['affiliation_id'], mentions['affiliation'],
+                mentions['subjects'], mentions['coauthor_ids']):
+            afids = _as_list(afids)
+            if len(afids) > 0:
+                row_list.extend([(i, 'affiliation', 'id:%s' %afid) for afid in afids])
+            elif isinstance(affiliation, str):
+                row_list.extend([(i, 'affiliation', 'w:' + word)
+                                 for word in _affiliation_words(affiliation)])
+            row_list.extend([(i, 'subject', str(subject).upper()) for subject in _as_list(subjects)])
+            row_list.extend([(i, 'coauthor', str(author_id)) for author_id in _as_list(coauthor_ids)])
+        return pd.DataFrame(row_list, columns=['mention', 'feature', 'key']).drop_duplicates()
+
+    def score(self, mentions):
+        '''
+            Score every candidate of every mention.
+
+            Parameters
+            ----------
+            mentions : pandas.DataFrame or list of dict
+                One mention per row: first and last name, and any hints
+                (affiliation_id, affiliation, subjects, coauthor_ids; see the
+                class documentation). Lists may also be single values.
+
+            Returns
+            -------
+            pandas.DataFrame
+                mention (row number in mentions), author_id, candidate_name,
+                document_count, current_affiliation, one column per feature
+                (NaN when the mention has no hint for it) and score.
+        '''
+        mentions = self._mention_frame(mentions)
+        hints = self._mention_keys(mentions)
+        candidates = self.candidates(mentions['key'].dropna())
+        pairs = (mentions[['key', 'first']].rename_axis('mention').reset_index()
+                 .merge(candidates, on='key'))
+        columns = ['mention', 'author_id', 'candidate_name', 'document_count',
+                   'current_affiliation'] + list(FEATURES) + ['score']
+        if len(pairs) == 0:
+            return pd.DataFrame(columns=columns)
+        pair_ids = pairs[['mention', 'author_id']]
+
+        # candidate keys: current affiliation and subjects from the author
+        # search, co-authors and publication affiliations from the documents
+        current = candidates.drop_duplicates('author_id')
+        with_id = current[current['affiliation_id'].notna()]
+        key_list = [pd.DataFrame({'author_id': with_id['author_id'], 'feature': 'affiliation',
+                                  'key': 'id:' + with_id['affiliation_id'].astype(str)})]
+        key_list.append(pd.DataFrame({'author_id': current['author_id'], 'feature': 'affiliation',
+                                      'key': current['affiliation'].map(
+                                          lambda name: ['w:' + w for w in _affiliation_words(name)])})
+                        .explode('key').dropna())
+        if self.documents and hints['feature'].isin(['affiliation', 'coauthor']).any():
+            hinted = pairs['mention'].isin(hints.loc[hints['feature'].isin(['affiliation', 'coauthor']),
+                                                     'mention'])
+            key_list.append(self.profiles(pairs.loc[hinted, 'author_id'].unique()))
+        candidate_keys = pd.concat(key_list, ignore_index=True).drop_duplicates()
+        subjects = pd.DataFrame([(author_id, subject, count)
+                                 for author_id, subject_dict in zip(current['author_id'],
+                                                                    current['subjects'])
+                                 for subject, count in (subject_dict or {}).items()],
+                                columns=['author_id', 'key', 'weight'])
+
+        def hints_of(feature):
+            return hints.loc[hints['feature'] == feature, ['mention', 'key']]
+
+        def keys_of(feature):
+            return candidate_keys.loc[candidate_keys['feature'] == feature, ['author_id', 'key']]
+
+        first = _first_word(pairs['first'])
+        given = _first_word(pairs['given_name'])
+        same = first == given
+        initial = ((first.str[:1] == given.str[:1]) & (first.str[:1] != '') &
+                   ((first.str.len() == 1) | (given.str.len() == 1)))
+        feature_values = {'name': np.where(same & (first != ''), 1., np.where(initial, .5, 0.)),
+                          'affiliation': _coverage(pair_ids, hints_of('affiliation'),
+                                                   keys_of('affiliation')),
+                          'subject': _cosine(pair_ids, hints_of('subject'), subjects),
+                          'coauthor': _coverage(pair_ids, hints_of('coauthor'), keys_of('coauthor'))}
+
+        X = np.column_stack([feature_values[feature] for feature in FEATURES]).astype(float)
+        W = np.array([self.weights[feature] for feature in FEATURES], dtype=float)
+        present = ~np.isnan(X)
+        score = np.where(present, X, 0.) @ W / (present @ W)
+        result = pd.DataFrame({'mention': pairs['mention'],
+                               'author_id': pairs['author_id'],
+                               'candidate_name': (pairs['given_name'].fillna('') + ' ' +
+                                                  pairs['surname'].fillna('')).str.strip(),
+                               'document_count': pairs['document_count'],
+                               'current_affiliation': pairs['affiliation']})
+        for j, feature in enumerate(FEATURES):
+            result[feature] = X[:, j]
+        result['score'] = score
+        return result.sort_values(['mention', 'score', 'document_count'],
+                                  ascending=[True, False, False], ignore_index=True)
+
+    def resolve(self, mentions, threshold=0.5):
+        '''
+            Best candidate of every mention (see score)
+
+            Parameters
+            ----------
+            threshold : float
+                Lowest score accepted; mentions whose best candidate scores less
+                are left unresolved (author_id None).
+
+            Returns
+            -------
+            pandas.DataFrame
+                The mentions, with author_id, score (of the best candidate),
+                margin (over the second best, NaN with a single candidate) and
+                n_candidates.
+        '''
+        mentions = pd.DataFrame(mentions).reset_index(drop=True)
+        scores = self.score(mentions)
+        group = scores.groupby('mention')
+        # scores are sorted best first within each mention
+        best = scores.drop_duplicates('mention').set_index('mention')
+        second = scores[scores.duplicated('mention')].drop_duplicates('mention')
+        second = second.set_index('mention')['score']
+        result = mentions.copy()
+        result['author_id'] = best['author_id'].reindex(result.index)
+        result['score'] = best['score'].reindex(result.index)
+        result['margin'] = result['score'] - second.reindex(result.index)
+        result['n_candidates'] = group.size().reindex(result.index, fill_value=0)
+        result.loc[~(result['score'] >= threshold), 'author_id'] = None
+        return result
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+'''
+    Typed, memory-compact data frames of search results
+'''
+
+from pyscopus.lazy import LazyModule
+
+pd = LazyModule('pandas')
+
+# column -> dtype of typed search results: nullable integers for counts and
+# years, categoricals for columns with few distinct values, dates for dates.
+# Identifiers (scopus id, EID, DOI, pages, issue, ...) stay strings: they are
+# not always numeric and must keep their exact text.
+SEARCH_DTYPES = {
+    1: {'Access Type': 'category',
+        'Page count': 'Int32',
+        'Year': 'Int16',
+        'Cover Date': 'date',
+        'Source_Title': 'category',
+        'Cited by': 'Int32',
+        'Document': 'category',
+        'Document Type': 'category'},
+    2: {'document_count': 'Int32',
+        'affiliation': 'category',
+        'affiliation_id': 'category'},
+}
+
+def _convert(series, dtype):
+    if dtype == 'category':
+        return series.astype('category')
+    if dtype == 'date':
+        return pd.to_datetime(series, format='%Y-%m-%d', errors='coerce')
+    return pd.to_numeric(series, errors='coerce').astype(dtype)
+
+def typed_frame(df, type_=1):
+    '''
+        Search results of a document (type_ 1) or author (type_ 2) search with
+        the dtypes of SEARCH_DTYPES, converted once for the whole frame.
+        Values that do not parse become missing (<NA>, NaT).
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Data frame as returned by Scopus.search.
+        type_ : int or str
+            Type of search.
+
+        Returns
+        -------
+        pandas.DataFrame
+            A new data frame; columns not in SEARCH_DTYPES are shared with df.
+    '''
+    dtypes = SEARCH_DTYPES[1 if type_ == 1 or type_ == 'article' else 2]
+    converted = {column: _convert(df[column], dtype)
+                 for column, dtype in dtypes.items() if column in df.columns}
+    return df.assign(**converted) if len(converted) > 0 else df.copy()
+
+def memory_saving(df, typed_df):
+    '''
+        Memory (bytes, strings and objects included) of every column of df and
+        typed_df (see typed_frame), and what the typed columns save
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by column, with columns before, after and saved, and a
+            'total' row.
+    '''
+    before = df.memory_usage(index=False, deep=True)
+    after = typed_df.memory_usage(index=False, deep=True).reindex(before.index)
+    report = pd.DataFrame({'before': before, 'after': after})
+    report.loc['total'] = report.sum()
+    report['saved'] = report['before'] - report['after']
+    return report
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+'''
+    Pool of Elsevier api keys with per-key quota tracking
+'''
+
+import threading, time
+
+from pyscopus.transport import ScopusHTTPError
+
+class QuotaExceeded(ScopusHTTPError):
+    '''
+        Every api key has used up its quota for an endpoint; the first one is
+        available again at `reset` (epoch seconds, None if unknown)
+    '''
+
+    def __init__(self, message, endpoint=None, reset=None, status_code=429):
+        ScopusHTTPError.__init__(self, message, status_code=status_code)
+        self.endpoint = endpoint
+        self.reset = reset
+
+def _with_key(params, key):
+    '''
+        Copy of request params carrying key, under whichever spelling the endpoint uses
+    '''
+    params = dict(params)
+    if 'apiKey' in params:
+        params['apiKey'] = key
+    else:
+        params['apikey'] = key
+    return params
+
+class KeyPool(object):
+    '''
+        Round-robin pool of api keys.
+
+        Requests are spread over the keys in turn. The quota left for each key and
+        endpoint is read from the X-RateLimit-Remaining/X-RateLimit-Reset headers;
+        a key whose quota is used up is skipped until its reset, and QuotaExceeded
+        is raised once no key is left for an endpoint.
+
+        A key the API rejects (401 for every endpoint, 403 for the endpoint it
+        was refused) is skipped too while the pool has other keys; adding it
+        again clears that. If every key is rejected, requests still go out so
+        that they fail with the API's error.
+
+        Parameters
+        ----------
+        keys : iterable
+            Api keys.
+    '''
+
+    def __init__(self, keys=()):
+        self.keys = list()
+        self._quota = dict()
+        # (key, endpoint) pairs refused by the API; endpoint None for all of them
+        self._rejected = set()
+        self._next = 0
+        self._lock = threading.Lock()
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        with self._lock:
+            if key not in self.keys:
+                self.keys.append(key)
+            self._rejected = set(pair for pair in self._rejected if pair[0] != key)
+
+    def remove(self, key):
+        with self._lock:
+            self.keys.remove(key)
+
+    def exhausted(self, key, endpoint):
+        '''
+            Whether key has no quota left for endpoint (until its reset, if known)
+        '''
+        remaining, reset = self._quota.get((key, endpoint), (None, None))
+        return remaining == 0 and (reset is None or reset > time.time())
+
+    def rejected(self, key, endpoint):
+        '''
+            Whether the API refused key (for endpoint, or for every endpoint)
+        '''
+        return (key, None) in self._rejected or (key, endpoint) in self._rejected
+
+    def get(self, endpoint, skip=()):
+        '''
+            Next key with quota left for endpoint (None if the pool is empty).
+            Keys in skip, those a request already ran out of quota with, are
+            passed over whatever their reset says; QuotaExceeded is raised if
+            no other key is left (or if skip holds None, for a pool without keys).
+        '''
+        with self._lock:
+            if len(self.keys) == 0 and None not in skip:
+                return None
+            # keys in good standing first, then rejected ones (to get their error)
+            for skip_rejected in (True, False):
+                for i in range(len(self.keys)):
+                    key = self.keys[(self._next+i) % len(self.keys)]
+                    if key in skip or self.exhausted(key, endpoint):
+                        continue
+                    if skip_rejected and self.rejected(key, endpoint):
+                        continue
+                    self._next = (self._next+i+1) % len(self.keys)
+                    return key
+            reset_list = [self._quota.get((key, endpoint), (None, None))[1]
+                          for key in self.keys or [None]]
+        reset_list = [reset for reset in reset_list if reset is not None]
+        reset = min(reset_list) if len(reset_list) > 0 else None
+        raise QuotaExceeded('Quota for %s requests exhausted%s%s'
+                            %(endpoint,
+                              ' for all %i api keys' %len(self.keys) if self.keys else '',
+                              '' if reset is None else ' until %s' %time.ctime(reset)),
+                            endpoint=endpoint, reset=reset)
+
+    def update(self, key, endpoint, status_code, headers):
+        '''
+            Record the quota left for key from a response. Returns True if the
+            key turned out to be exhausted, or was refused while other keys are
+            left (its request should go to another key).
+        '''
+        if status_code in (401, 403) and key is not None:
+            with self._lock:
+                self._rejected.add((key, None if status_code == 401 else endpoint))
+                return any(not self.exhausted(other, endpoint) and
+                           not self.rejected(other, endpoint) for other in self.keys)
+        try:
+            remaining = int(headers['X-RateLimit-Remaining'])
+        except (KeyError, TypeError, ValueError):
+            remaining = None
+        try:
+            reset = float(headers['X-RateLimit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            reset = None
+        if status_code == 429 and 'QUOTA_EXCEEDED' in str(headers.get('X-ELS-Status', '')):
+            remaining = 0
+        if remaining is None:
+            return False
+        with self._lock:
+            self._quota[(key, endpoint)] = (remaining, reset)
+        return status_code == 429 and remaining == 0
+
+    def remaining(self, endpoint):
+        '''
+            Last seen remaining quota of each key for endpoint (None if unknown)
+        '''
+        return {key: self._quota.get((key, endpoint), (None, None))[0] for key in self.keys}
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+'''
+    Deferred imports of heavy dependencies
+'''
+
+import importlib, importlib.util
+
+class LazyModule(object):
+    '''
+        Stand-in for a module that is only imported when one of its attributes
+        is first looked up, so that importing pyscopus does not pay for pandas,
+        numpy, requests or aiohttp until they are used:
+
+            pd = LazyModule('pandas')
+            pd.DataFrame(...)   # pandas is imported here
+
+        The import goes through importlib.import_module, which holds the import
+        lock of the module, so threads reaching it together import it once.
+
+        Parameters
+        ----------
+        name : str
+            Full name of the module, e.g. 'requests.adapters'.
+    '''
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return '<lazy module %r>' %self.__dict__['_name']
+
+def lazy_import(name):
+    '''
+        LazyModule for name if it is installed, None otherwise (the lazy form
+        of `try: import name / except ImportError: name = None`)
+    '''
+    try:
+        if importlib.util.find_spec(name) is None:
+            return None
+    except (ImportError, ValueError):
+        return None
+    return LazyModule(name)
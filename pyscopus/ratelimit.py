@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+'''
+    Client-side throttling for the Scopus APIs
+'''
+
+import random, threading, time
+
+from pyscopus import APIURI
+from pyscopus.lazy import LazyModule
+
+asyncio = LazyModule('asyncio')
+
+# Default per-second throttles of a standard api key, by endpoint
+# (see https://dev.elsevier.com/api_key_settings.html)
+DEFAULT_BUDGETS = {'search': 9, 'search_author': 2, 'author': 3, 'abstract': 9,
+                   'citation': 3, 'serial': 3, 'affiliation': 6}
+
+_ENDPOINT_URIS = (('search', 'SEARCH'), ('search_author', 'SEARCH_AUTHOR'),
+                  ('author', 'AUTHOR'), ('abstract', 'ABSTRACT'),
+                  ('citation', 'CITATION'), ('serial', 'SERIAL_SEARCH'),
+                  ('affiliation', 'AFFL_RETRIEVAL'))
+
+def endpoint_of(url):
+    '''
+        Name of the Scopus endpoint a request url belongs to ('other' if none)
+    '''
+    best, best_len = 'other', 0
+    for endpoint, attr in _ENDPOINT_URIS:
+        uri = getattr(APIURI, attr)
+        # search/author search and serial search/retrieval share prefixes: longest wins
+        if url.startswith(uri) and len(uri) > best_len:
+            best, best_len = endpoint, len(uri)
+    return best
+
+class TokenBucket(object):
+    '''
+        Thread-safe token bucket refilled at `rate` tokens per second.
+
+        reserve() takes a token right away and returns how long the caller must
+        wait before using it, so the same bucket paces threads and coroutines alike.
+    '''
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1., self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now-self._last)*self.rate)
+        self._last = now
+
+    def reserve(self):
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.
+            return -self._tokens/self.rate
+
+class RateLimiter(object):
+    '''
+        Per-endpoint (and per api key) token buckets with backoff on 429.
+
+        One limiter can be shared by several Scopus/AsyncScopus clients (and all
+        their threads and coroutines) so that together they stay within budget.
+        Throttles apply to each api key separately, so every key of a KeyPool gets
+        its own buckets.
+
+        Parameters
+        ----------
+        budgets : dict
+            Requests per second by endpoint name (see DEFAULT_BUDGETS), merged over
+            the defaults. Endpoints without a budget are not throttled.
+        max_retries : int
+            How many times a throttled (429) or unavailable (503) request is retried.
+        backoff : float
+            Base delay in seconds of the exponential backoff between retries.
+        max_backoff : float
+            Upper bound of a single backoff delay.
+    '''
+
+    RETRY_STATUS = (429, 503)
+
+    def __init__(self, budgets=None, max_retries=5, backoff=1., max_backoff=60.):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        if budgets is not None:
+            self.budgets.update(budgets)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._buckets = dict()
+        self._paused_until = dict()
+        self._lock = threading.Lock()
+
+    def _wait(self, endpoint, key):
+        wait = self._paused_until.get((endpoint, key), 0) - time.monotonic()
+        if self.budgets.get(endpoint) is None:
+            return wait
+        with self._lock:
+            if (endpoint, key) not in self._buckets:
+                self._buckets[(endpoint, key)] = TokenBucket(self.budgets[endpoint])
+            bucket = self._buckets[(endpoint, key)]
+        return max(wait, bucket.reserve())
+
+    def acquire(self, endpoint, key=None):
+        '''
+            Block until a request to endpoint (with api key) may be sent
+        '''
+        wait = self._wait(endpoint, key)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint, key=None):
+        wait = self._wait(endpoint, key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def retry_delay(self, endpoint, status_code, headers, attempt, key=None):
+        '''
+            Backoff delay before retrying a response, or None if it should not be retried.
+            The delay pauses the endpoint for that key, so the next acquire() of every
+            caller (the retrying one included) waits it out.
+        '''
+        if status_code not in self.RETRY_STATUS or attempt >= self.max_retries:
+            return None
+        try:
+            delay = float(headers['Retry-After'])
+        except (KeyError, TypeError, ValueError):
+            delay = min(self.max_backoff, self.backoff*2**attempt)
+            # jitter so that throttled workers do not come back in lockstep
+            delay = delay/2 + random.uniform(0, delay/2)
+        with self._lock:
+            self._paused_until[(endpoint, key)] = max(self._paused_until.get((endpoint, key), 0),
+                                                      time.monotonic()+delay)
+        return delay
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+    Offline re-parsing of saved Scopus responses on a process pool
+'''
+
+import collections, json, os, warnings
+
+from concurrent.futures import ProcessPoolExecutor
+from pyscopus.archive import ResponseArchive, read_record
+from pyscopus.transport import default_json_decoder
+from pyscopus.utils import _parse_abstract_retrieval, _parse_search_page, _RecordColumns
+
+def _parse_abstract_record(js, id_):
+    # same record as Scopus.retrieve_abstracts
+    try:
+        record = _parse_abstract_retrieval(js)
+        record['Retrieval Error'] = None
+    except Exception as e:
+        record = {'Retrieval Error': '%s: %s' %(type(e).__name__, e)}
+    record['scopus_id'] = id_
+    return [record]
+
+def _parse_search_records(js, id_):
+    return _parse_search_page(js, 1)[0]
+
+# kind of saved response -> function(decoded response, id) returning records
+PARSERS = {'abstract': _parse_abstract_record,
+           'search': _parse_search_records}
+
+def _saved_responses(source, kind):
+    # (id, location) of every saved response of kind in source; a location is a
+    # file path, or (shard path, offset, size) in an archive
+    if isinstance(source, ResponseArchive):
+        return [(id_, (shard_path, offset, size))
+                for _, id_, shard_path, offset, size in source.locations(kind)]
+    if os.path.exists(os.path.join(source, 'index.sqlite')):
+        with ResponseArchive(source) as archive:
+            return _saved_responses(archive, kind)
+    return [(name[:-len('.json')], os.path.join(source, name))
+            for name in sorted(os.listdir(source)) if name.endswith('.json')]
+
+def _replay_chunk(kind, chunk):
+    '''
+        Read, decode and parse a chunk of saved responses (run in a worker process)
+    '''
+    decoder = default_json_decoder()
+    parse = PARSERS[kind]
+    record_list = []
+    f = None
+    for id_, location in chunk:
+        try:
+            if isinstance(location, str):
+                with open(location, 'rb') as g:
+                    content = g.read()
+            else:
+                shard_path, offset, size = location
+                if f is None or f.name != shard_path:
+                    if f is not None:
+                        f.close()
+                    f = open(shard_path, 'rb')
+                content = read_record(shard_path, offset, size, f)
+            js = decoder(content)
+        except Exception as e:
+            if kind == 'abstract':
+                record_list.append({'Retrieval Error': '%s: %s' %(type(e).__name__, e),
+                                    'scopus_id': id_})
+            else:
+                warnings.warn('Skipped saved response %s: %s' %(id_, e), UserWarning)
+            continue
+        record_list.extend(parse(js, id_))
+    if f is not None:
+        f.close()
+    return record_list
+
+def iter_replay(source, kind='abstract', workers=None, chunk_size=64):
+    '''
+        Re-parse saved responses, yielding the records in the order of source.
+
+        Parameters
+        ----------
+        source : str or pyscopus.archive.ResponseArchive
+            A ResponseArchive (or its directory), or a directory of <id>.json
+            responses as saved by retrieve_abstract(download_path=...).
+        kind : str
+            Kind of response to parse: 'abstract' (records as retrieve_abstracts
+            gives them) or 'search' (document search pages archived by search,
+            records as search gives them, page by page in the order the pages
+            were archived; whole pages, even where search kept only the first
+            records of the last one).
+        workers : int
+            Number of worker processes. Default is the number of cores; 1 parses
+            in this process.
+        chunk_size : int
+            Number of responses handed to a worker at a time.
+
+        Yields
+        ------
+        dict
+            Parsed record
+    '''
+    if kind not in PARSERS:
+        raise ValueError('Cannot replay %s responses (use one of %s)' %(kind, ', '.join(PARSERS)))
+    saved_list = _saved_responses(source, kind)
+    chunk_list = [saved_list[i:i+chunk_size] for i in range(0, len(saved_list), chunk_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for chunk in chunk_list:
+            for record in _replay_chunk(kind, chunk):
+                yield record
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # a couple of chunks queued per worker keeps them busy with bounded memory
+        pending = collections.deque()
+        for chunk in chunk_list:
+            pending.append(executor.submit(_replay_chunk, kind, chunk))
+            if len(pending) >= 2*workers:
+                for record in pending.popleft().result():
+                    yield record
+        while pending:
+            for record in pending.popleft().result():
+                yield record
+
+def replay(source, kind='abstract', workers=None, chunk_size=64, output=None):
+    '''
+        Re-parse saved responses (see iter_replay) into a data frame, or stream
+        them to a file.
+
+        Parameters
+        ----------
+        output : str
+            Path of a file the records are written to as they are parsed: a
+            Parquet (.parquet) or Arrow (.arrow, .feather) file (see
+            pyscopus.sink.ParquetSink), otherwise JSON lines. Default is None
+            (return a data frame).
+
+        Returns
+        -------
+        pandas.DataFrame, or the number of records written to output
+    '''
+    record_iter = iter_replay(source, kind=kind, workers=workers, chunk_size=chunk_size)
+    if output is None:
+        return _RecordColumns(record_iter).to_frame()
+    if output.endswith(('.parquet', '.arrow', '.feather')):
+        from pyscopus.sink import ParquetSink, search_schema
+        schema = search_schema(1) if kind == 'search' else None
+        with ParquetSink(output, schema=schema) as sink:
+            for record in record_iter:
+                sink.write([record])
+        return sink.rows
+    n = 0
+    with open(output, 'w') as f:
+        for record in record_iter:
+            f.write(json.dumps(record, default=str))
+            f.write('\n')
+            n += 1
+    return n
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+'''
+    What to do with the responses to one API request: caching, archiving,
+    backoff and api key failover, shared by Scopus and AsyncScopus (which
+    only differ in how they send the request and wait)
+'''
+
+from pyscopus.keypool import _with_key
+from pyscopus.ratelimit import endpoint_of
+from pyscopus.transport import check_status
+
+class _Request(object):
+    '''
+        One GET of url, sent as many times as it takes:
+
+            request = _Request(url, params, key_pool, rate_limiter, cache, archive, archive_key)
+            r = request.cached()
+            if r is None:
+                while True:
+                    key = request.next_key()
+                    # wait for rate_limiter, send request.params with key ...
+                    if request.done(r):
+                        break
+                request.store(r)
+
+        cached() and store() do the cache and archive I/O, which the async
+        client runs off the event loop.
+    '''
+
+    def __init__(self, url, params, key_pool, rate_limiter, cache=None, archive=None,
+                 archive_key=None):
+        self.url = url
+        self.params = params
+        self.endpoint = endpoint_of(url)
+        self.key_pool = key_pool
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.archive = archive if archive_key is not None else None
+        self.archive_key = archive_key
+        self.key = None
+        self.attempt = 0
+        # keys this request ran out of quota with; they are not tried again
+        self.tried = set()
+
+    def cached(self):
+        '''
+            Fresh cached response (archived if the archive does not have it yet), or None
+        '''
+        if self.cache is None:
+            return None
+        r = self.cache.get(self.endpoint, self.url, self.params)
+        if r is not None and self.archive is not None and self.archive_key not in self.archive:
+            self.archive.put(self.archive_key[0], self.archive_key[1], r.content)
+        return r
+
+    def next_key(self):
+        '''
+            Key to send the request with next (None without keys), set in params.
+            Raises QuotaExceeded once every key is used up for the endpoint.
+        '''
+        self.key = self.key_pool.get(self.endpoint, skip=self.tried)
+        if self.key is not None:
+            self.params = _with_key(self.params, self.key)
+        return self.key
+
+    def done(self, r):
+        '''
+            Whether r is the final response; if not, the request goes again, with
+            another key if this one ran out of quota, or else after the backoff
+            the rate limiter has set for the key. A final error response raises
+            ScopusHTTPError.
+        '''
+        if self.key_pool.update(self.key, self.endpoint, r.status_code, r.headers):
+            self.tried.add(self.key)
+            return False
+        delay = self.rate_limiter.retry_delay(self.endpoint, r.status_code, r.headers,
+                                              self.attempt, self.key)
+        if delay is not None:
+            self.attempt += 1
+            return False
+        check_status(self.url, r.status_code, r.content)
+        return True
+
+    def store(self, r):
+        '''
+            Cache and archive the final response r
+        '''
+        if self.cache is not None:
+            self.cache.put(self.endpoint, self.url, self.params, r)
+        if self.archive is not None:
+            self.archive.put(self.archive_key[0], self.archive_key[1], r.content)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+'''
+    Declarative field extraction for Scopus JSON
+
+    A schema is a list of fields, each mapping output column(s) to a path in the
+    JSON and an optional rule applied to the value found there:
+
+        ARTICLE = compile_schema([
+            ('Pub_Title', 'dc:title'),
+            ('ISSN', 'prism:issn', Join(', ')),
+            ('Year', 'prism:coverDate', lambda d: d.split('-')[0] if d else None),
+            (('Page start', 'Page end'), 'prism:pageRange', split_range),
+        ])
+        record = ARTICLE(entry)
+
+    A path is a key, or a tuple of keys and list indices. compile_schema turns
+    the schema into one function once, so extraction is a series of dict
+    lookups with no exception handling for missing fields.
+    A missing path gives the field's default (None); a rule is only applied to
+    values that are present. A field with a tuple of columns takes a rule that
+    returns one value per column.
+'''
+
+_MISSING = object()
+
+class Join(object):
+    '''
+        Rule joining a list of {item: value} dicts (the usual {'$': value} shape
+        of repeated Scopus elements) with sep. Non-list values pass through.
+    '''
+
+    def __init__(self, sep, item='$'):
+        self.sep = sep
+        self.item = item
+
+    def __call__(self, value):
+        if isinstance(value, list):
+            item = self.item
+            return self.sep.join([x[item] for x in value if item in x])
+        return value
+
+def _path_source(path, target):
+    # statements setting target to the value at path in obj (a dict), or to _MISSING
+    lines = ['%s = obj.get(%r, _MISSING)' %(target, path[0])]
+    for key in path[1:]:
+        if isinstance(key, int):
+            lines.append('%s = %s[%r] if isinstance(%s, list) and -len(%s) <= %r < len(%s) else _MISSING'
+                         %(target, target, key, target, target, key, target))
+        else:
+            lines.append('%s = %s.get(%r, _MISSING) if isinstance(%s, dict) else _MISSING'
+                         %(target, target, key, target))
+    return lines
+
+def compile_schema(schema):
+    '''
+        Compile a schema (list of (column, path[, rule[, default]]) tuples) into a
+        function extract(obj, record=None) filling record (a new dict by default)
+        with one entry per column, in schema order, and returning it.
+
+        The whole schema becomes the source of a single function (as
+        collections.namedtuple does for its classes), so extraction costs one
+        call and a few dict lookups per field.
+    '''
+    names = {'_MISSING': _MISSING}
+    body = []
+    for i, field in enumerate(schema):
+        column, path = field[:2]
+        rule = field[2] if len(field) > 2 else None
+        default = field[3] if len(field) > 3 else None
+        if not isinstance(path, tuple):
+            path = (path,)
+        if rule is None and not isinstance(column, tuple) and len(path) == 1:
+            names['default_%i' %i] = default
+            body.append('record[%r] = obj.get(%r, default_%i)' %(column, path[0], i))
+            continue
+        names['rule_%i' %i] = rule
+        names['default_%i' %i] = default
+        body.extend(_path_source(path, 'v'))
+        value = 'v' if rule is None else 'rule_%i(v)' %i
+        if isinstance(column, tuple):
+            names['columns_%i' %i] = column
+            body.extend(['if v is _MISSING:',
+                         '    v = (default_%i,)*%i' %(i, len(column)),
+                         'else:',
+                         '    v = %s' %value,
+                         'for col, x in zip(columns_%i, v):' %i,
+                         '    record[col] = x'])
+        else:
+            body.append('record[%r] = default_%i if v is _MISSING else %s' %(column, i, value))
+    # the rules and defaults are bound as closure variables of extract
+    source = '\n'.join(['def make_extract(%s):' %', '.join(names),
+                        '    def extract(obj, record=None):',
+                        '        if record is None:',
+                        '            record = {}'] +
+                       ['        ' + line for line in body] +
+                       ['        return record',
+                        '    return extract'])
+    namespace = {}
+    exec(source, namespace)
+    extract = namespace['make_extract'](**names)
+    extract.columns = [field[0] for field in schema]
+    return extract
@@ -1,15 +1,28 @@
 # -*- coding: utf-8 -*-
 
-import requests, warnings, os, json
-import numpy as np
-import pandas as pd
+import warnings, os, collections, copy
 
-from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 from pyscopus import APIURI
-from pyscopus.utils import _parse_author, _parse_author_retrieval,\
-        _parse_affiliation, _parse_entry, _parse_citation,\
-        _parse_abstract_retrieval, trunc,\
-        _search_scopus, _parse_serial, _parse_aff
+from pyscopus.transport import Transport, default_json_decoder
+from pyscopus.ratelimit import RateLimiter
+from pyscopus.keypool import KeyPool
+from pyscopus.request import _Request
+from pyscopus.cache import LRUCache
+from pyscopus.frame import typed_frame
+from pyscopus.tables import _LinkColumns
+from pyscopus.lazy import LazyModule
+from pyscopus.utils import _parse_author_retrieval, _parse_citation,\
+        _parse_abstract_retrieval, _search_scopus_page, _parse_serial, _parse_aff,\
+        _RecordColumns
+
+pd = LazyModule('pandas')
+
+# The Scopus Search API refuses start offsets beyond this; deeper result sets
+# have to be walked with a cursor.
+OFFSET_LIMIT = 5000
+# Most scopus ids the Citation Overview API takes in one request
+CITATION_CHUNK_SIZE = 25
 
 class Scopus(object):
     '''
@@ -23,13 +36,239 @@ class Scopus(object):
         zhiyazuo@gmail.com
     '''
 
-    def __init__(self, apikey=None):
-        self.apikey = apikey
+    def __init__(self, apikey=None, transport=None, pool_size=10, timeout=30,
+                 rate_limiter=None, key_pool=None, cache=None, entity_cache_size=1024,
+                 json_decoder=None, archive=None):
+        '''
+            Parameters
+            ----------
+            apikey : str or list
+                Elsevier api key, or several keys to spread requests over.
+            transport : object
+                Anything with a get(url, params=None, headers=None) method returning
+                a requests.Response-like object. Default is a pooled Transport.
+            pool_size : int
+                Keep-alive connections of the default transport.
+            timeout : float or tuple
+                Request timeout (seconds) of the default transport.
+            rate_limiter : pyscopus.ratelimit.RateLimiter
+                Throttle shared by all threads of this client; pass the same one to
+                several clients to share a budget. Default is a RateLimiter with
+                the standard per-endpoint throttles.
+            key_pool : pyscopus.keypool.KeyPool
+                Pool of api keys, possibly shared with other clients. By default
+                a pool of the key(s) given as apikey.
+            cache : pyscopus.cache.ResponseCache
+                Persistent response cache. Default is None (no caching).
+            entity_cache_size : int
+                Number of parsed authors, affiliations and serials kept in memory by
+                retrieve_author, retrieve_affiliation and retrieve_serial (see
+                entity_cache). 0 disables it.
+            json_decoder : callable
+                Function decoding a response body (bytes) into Python objects.
+                Default is orjson.loads if orjson is installed, json.loads otherwise.
+            archive : pyscopus.archive.ResponseArchive
+                Archive every retrieve_* method stores its raw responses in, keyed
+                by kind ('abstract', 'author', 'affiliation', 'serial', 'citation',
+                'full_text') and id ('<id>|<view>' for affiliations and serials),
+                and searches their pages in, keyed by kind
+                ('search' for documents, 'author_search') and '<query>|<start or
+                cursor>'. Default is None (no archive).
+        '''
+        if key_pool is None:
+            if apikey is None:
+                key_pool = KeyPool()
+            elif isinstance(apikey, str):
+                key_pool = KeyPool([apikey])
+            else:
+                key_pool = KeyPool(apikey)
+        self.key_pool = key_pool
+        self.apikey = key_pool.keys[0] if len(key_pool) > 0 else None
+        if transport is None:
+            transport = Transport(pool_size=pool_size, timeout=timeout)
+        self.transport = transport
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.entity_cache = LRUCache(maxsize=entity_cache_size)
+        if json_decoder is None:
+            json_decoder = default_json_decoder()
+        self.json_decoder = json_decoder
+        self.archive = archive
 
     def add_key(self, apikey):
+        '''
+            Set the api key requests are made with, replacing the pool of keys
+            (see add_pool_key to spread requests over several keys)
+        '''
+        self.key_pool = KeyPool([apikey])
         self.apikey = apikey
 
-    def search(self, query, count=100, type_=1, view='COMPLETE'):
+    def add_pool_key(self, apikey):
+        '''
+            Add an api key to the pool requests are spread over
+        '''
+        self.key_pool.add(apikey)
+        if self.apikey is None:
+            self.apikey = apikey
+
+    def close(self):
+        '''
+            Release the pooled connections held by the transport
+        '''
+        if hasattr(self.transport, 'close'):
+            self.transport.close()
+
+    def _memoized(self, key, retrieve):
+        '''
+            Parsed entity from the in-memory entity cache, retrieved and stored on a miss.
+            Callers get a copy, so changing it does not change the cached entity.
+        '''
+        value = self.entity_cache.get(key)
+        if value is None:
+            value = retrieve()
+            self.entity_cache.put(key, value)
+        return copy.deepcopy(value)
+
+    def _request(self, url, params, archive_key=None):
+        '''
+            GET through the transport with the next key of the pool, paced by the rate
+            limiter. Throttled responses are retried with backoff, and with another key
+            if the quota of this one is used up. Error responses raise ScopusHTTPError.
+            With a cache, fresh cached responses are returned without any request.
+            With an archive, the response is archived under archive_key (kind, id);
+            a cached response only if the archive does not have it yet.
+        '''
+        request = _Request(url, params, self.key_pool, self.rate_limiter, self.cache,
+                           self.archive, archive_key)
+        r = request.cached()
+        if r is not None:
+            return r
+        while True:
+            # raises QuotaExceeded once every key is used up for this endpoint
+            key = request.next_key()
+            self.rate_limiter.acquire(request.endpoint, key)
+            r = self.transport.get(url, params=request.params)
+            if request.done(r):
+                break
+        request.store(r)
+        return r
+
+    def _fetch(self, url, params, archive_key=None):
+        return self.json_decoder(self._request(url, params, archive_key).content)
+
+    def _imap(self, func, iterable, workers=1):
+        '''
+            Lazy map() that runs func on a bounded thread pool when workers > 1,
+            keeping at most `workers` calls in flight. Results come back in input order.
+        '''
+        if workers is None or workers <= 1:
+            for item in iterable:
+                yield func(item)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for item in iterable:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _map(self, func, iterable, workers=1):
+        return list(self._imap(func, iterable, workers=workers))
+
+    def _open_sink(self, sink, search_type=None):
+        '''
+            (sink, whether it is ours to close) for a sink argument: a path opens a
+            ParquetSink, typed as search results if search_type is given
+        '''
+        if not isinstance(sink, str):
+            return sink, False
+        # pyarrow is only imported when a sink is used
+        from pyscopus.sink import ParquetSink, search_schema
+        schema = search_schema(search_type) if search_type is not None else None
+        return ParquetSink(sink, schema=schema), True
+
+    def _write_sink(self, sink, batches, search_type=None, frames=False):
+        '''
+            Write batches (lists of records, or data frames) to sink; returns the
+            number of records written
+        '''
+        sink, own = self._open_sink(sink, search_type)
+        n = 0
+        try:
+            for batch in batches:
+                if frames:
+                    sink.write_frame(batch)
+                else:
+                    sink.write(batch)
+                n += len(batch)
+        finally:
+            if own:
+                sink.close()
+        return n
+
+    def _iter_pages(self, query, count, type_, view, workers=1, cursor=None, links=False):
+        '''
+            Generator of parsed search pages (lists of records), in result order,
+            holding at most count records in total. With links, records come
+            with their authorships (see _parse_search_page).
+        '''
+        if type(count) is not int:
+            raise ValueError("%s is not a valid input for the number of entries to return." %count)
+
+        is_document = type_ == 1 or type_ == 'article'
+        if cursor and not is_document:
+            raise ValueError("Cursor pagination is only available for document search.")
+        auto_cursor = cursor is None
+        if auto_cursor:
+            cursor = is_document and count > OFFSET_LIMIT
+
+        record_list, total_count, next_cursor = _search_scopus_page(
+                self.apikey, query, type_, view=view, fetch=self._fetch,
+                cursor='*' if cursor else None, links=links, archive=True)
+
+        # if total_count == 0:
+        #     raise ValueError("No results returned for scoupus search")
+
+        if total_count <= count:
+            count = total_count
+        if auto_cursor and count <= OFFSET_LIMIT:
+            # offsets are enough after all, and they can be fetched concurrently
+            cursor = False
+
+        yield record_list[:count]
+        if count <= 25:
+            # if less than 25, just one page of response is enough
+            return
+
+        if cursor:
+            # follow @next until enough; each request costs the same however deep it goes
+            n = len(record_list)
+            while n < count and next_cursor is not None:
+                record_list, _, next_cursor = _search_scopus_page(
+                        self.apikey, query, type_, view=view, fetch=self._fetch,
+                        cursor=next_cursor, links=links, archive=True)
+                if len(record_list) == 0:
+                    return
+                yield record_list[:count-n]
+                n += len(record_list)
+            return
+
+        # if larger than, the remaining start indices are all known: fetch them
+        # (concurrently if asked to) and merge in index order
+        def fetch_page(index):
+            return _search_scopus_page(self.apikey, query, type_, view=view, index=index,
+                                       fetch=self._fetch, links=links, archive=True)[0]
+
+        for index, record_list in zip(range(25, count, 25),
+                                      self._imap(fetch_page, range(25, count, 25), workers=workers)):
+            yield record_list[:count-index]
+
+    def search(self, query, count=100, type_=1, view='COMPLETE', workers=1, cursor=None,
+               sink=None, typed=False, tables=False):
         '''
             Search for documents matching the keywords in query
             Details: http://api.elsevier.com/documentation/SCOPUSSearchAPI.wadl
@@ -43,41 +282,132 @@ class Scopus(object):
                 The number of records to be returned.
             view : string
                 Returned result view (i.e., return fields). Can only be STANDARD for author search.
+            workers : int
+                Number of pages fetched concurrently once the total is known.
+                Default is 1 (one page after another). Keep it within pool_size.
+                Not used with cursor pagination, which is sequential by nature.
+            cursor : bool
+                Page with cursor=*/@next instead of start offsets, which the API caps
+                at OFFSET_LIMIT (5000) records. By default a cursor is only used when
+                a document search really has more results than that.
+            sink : str or pyscopus.sink.ParquetSink
+                Write the results, page by page, to this Parquet (or .arrow) file
+                or sink instead of returning them, so memory stays bounded.
+                Needs pyarrow.
+            typed : bool
+                Give counts and years nullable integer dtypes, low-cardinality
+                columns (source, document type, ...) categorical dtypes and Cover
+                Date a datetime dtype (see pyscopus.frame.SEARCH_DTYPES), which
+                takes a fraction of the memory of the default object/string
+                columns. Default is False.
+            tables : bool
+                Also return the authors of the documents as normalized tables, for
+                vectorized joins and group-bys instead of splitting Authors_ID.
+                Document search with view='COMPLETE' only (other views have no
+                authors). Default is False.
 
             Returns
             ----------------------------------------------------------------------
             pandas.DataFrame
-               Data frame of search results.
+               Data frame of search results (the number of records written with a sink).
+               With tables, a dict of data frames:
+                   documents: the search results, whose row number (0, 1, ...)
+                       is the document number doc of the other tables
+                   authorships: doc, author_id, position (@seq) of every author
+                       of every document
+                   author_affiliations: doc, author_id, affiliation_id of every
+                       affiliation of an author on a document
+                   authors: author_id, name, surname, given_name, initials
+                   affiliations: affiliation_id, name, city, country
+               Ids are nullable 64-bit integers.
         '''
 
+        if tables:
+            if sink is not None:
+                raise ValueError("tables cannot be written to a sink.")
+            if not (type_ == 1 or type_ == 'article'):
+                raise ValueError("tables are only available for document search.")
+            if view != 'COMPLETE':
+                warnings.warn("The %s view has no authors: tables will be empty (use view='COMPLETE')"
+                              %view, UserWarning)
+            columns = _RecordColumns()
+            link_columns = _LinkColumns()
+            for page in self._iter_pages(query, count, type_, view, workers=workers,
+                                         cursor=cursor, links=True):
+                for record, links in page:
+                    link_columns.add(len(columns), links)
+                    columns.append(record)
+            df = columns.to_frame()
+            return link_columns.to_frames(typed_frame(df, type_) if typed else df)
+
+        if sink is not None:
+            return self._write_sink(sink, self._iter_pages(query, count, type_, view,
+                                                           workers=workers, cursor=cursor),
+                                    search_type=type_)
+
+        # collect plain records column by column and build the data frame once:
+        # concatenating frame by frame copies everything fetched so far on every page
+        columns = _RecordColumns()
+        for page in self._iter_pages(query, count, type_, view,
+                                     workers=workers, cursor=cursor):
+            columns.extend(page)
+        if typed:
+            return typed_frame(columns.to_frame(), type_)
+        return columns.to_frame()
+
+    def iter_search(self, query, count=100, type_=1, view='COMPLETE', batch_size=None,
+                    workers=1, cursor=None, typed=False):
+        '''
+            Generator version of search: records are handed out as pages arrive,
+            so only the current page (or batch) is held in memory.
 
-        if type(count) is not int:
-            raise ValueError("%s is not a valid input for the number of entries to return." %count)
-
-        result_df, total_count = _search_scopus(self.apikey, query, type_, view=view)
-
-        # if total_count == 0:
-        #     raise ValueError("No results returned for scoupus search")
-
-        if total_count <= count:
-            count = total_count
-
-        if count <= 25:
-            # if less than 25, just one page of response is enough
-            return result_df[:count]
-
-        # if larger than, go to next few pages until enough
-        i = 1
-        while True:
-            index = 25*i
-            #result_df = result_df.append(_search_scopus(self.apikey, query, type_, view=view, index=index),
-                                         #ignore_index=True)
-            result_df = pd.concat([result_df,_search_scopus(self.apikey, query, type_, view=view, index=index)],ignore_index=True) 
-            if result_df.shape[0] >= count:
-                return result_df[:count]
-            i += 1
+            Parameters
+            ----------------------------------------------------------------------
+            query : str
+                Query style (see search).
+            count : int
+                The number of records to be returned.
+            view : string
+                Returned result view (i.e., return fields). Can only be STANDARD for author search.
+            batch_size : int
+                If given, yield data frames of batch_size records (the last one may be
+                shorter) instead of single records.
+            workers : int
+                Number of pages fetched ahead concurrently (see search).
+            cursor : bool
+                Use cursor pagination (see search).
+            typed : bool
+                Give the batch data frames typed columns (see search). The
+                categories of a categorical column are those of its batch.
+
+            Yields
+            ----------------------------------------------------------------------
+            dict or pandas.DataFrame
+               One parsed record at a time, or a data frame per batch.
+        '''
 
-    def search_author(self, query, view='STANDARD', count=10):
+        if batch_size is not None and (type(batch_size) is not int or batch_size < 1):
+            raise ValueError("%s is not a valid batch size." %batch_size)
+
+        def to_frame(records):
+            df = _RecordColumns(records).to_frame()
+            return typed_frame(df, type_) if typed else df
+
+        batch = list()
+        for page in self._iter_pages(query, count, type_, view,
+                                     workers=workers, cursor=cursor):
+            if batch_size is None:
+                for record in page:
+                    yield record
+                continue
+            batch.extend(page)
+            while len(batch) >= batch_size:
+                yield to_frame(batch[:batch_size])
+                batch = batch[batch_size:]
+        if len(batch) > 0:
+            yield to_frame(batch)
+
+    def search_author(self, query, view='STANDARD', count=10, typed=False):
         '''
             Search for specific authors
             Details: http://api.elsevier.com/documentation/AUTHORSearchAPI.wadl
@@ -91,6 +421,8 @@ class Scopus(object):
                 The number of records to be returned.
             view : string
                 Returned result view (i.e., return fields). Can only be STANDARD for author search.
+            typed : bool
+                Typed columns (see search).
 
             Returns
             ----------------------------------------------------------------------
@@ -98,9 +430,10 @@ class Scopus(object):
                Data frame of search results.
         '''
 
-        return self.search(query, count, type_=2, view=view)
+        return self.search(query, count, type_=2, view=view, typed=typed)
 
-    def search_author_publication(self, author_id, count=10000):
+    def search_author_publication(self, author_id, count=10000, workers=1, sink=None,
+                                  typed=False, tables=False):
         '''
             Returns a list of document records for an author in the form of pandas.DataFrame.
 
@@ -113,15 +446,23 @@ class Scopus(object):
                 Author id in Scopus database.
             count : int
                 The number of records to return. By default set to 10000 for all docs.
+            workers : int
+                Number of pages fetched concurrently (see search).
+            sink : str or pyscopus.sink.ParquetSink
+                Write the results to a file instead (see search).
+            typed : bool
+                Typed columns (see search).
+            tables : bool
+                Also return normalized author tables (see search).
 
             Returns
             ----------------------------------------------------------------------
             pandas.DataFrame
-               Data frame of search results.
+               Data frame of search results (a dict of data frames with tables).
         '''
 
         query = 'au-id(%s)'%author_id
-        return self.search(query, count)
+        return self.search(query, count, workers=workers, sink=sink, typed=typed, tables=tables)
 
     def retrieve_author(self, author_id):
         '''
@@ -136,19 +477,21 @@ class Scopus(object):
             Returns
             ----------------------------------------------------------------------
             dict
-               Dictionary of author information.
+               Dictionary of author information. Repeated lookups are served from
+               entity_cache; use entity_cache.invalidate(('author', author_id)) to refetch.
         '''
 
-        par = {'apikey': self.apikey, 'httpAccept': 'application/json'}
-        r = requests.get('%s/%s'%(APIURI.AUTHOR, author_id), params=par)
+        def retrieve():
+            par = {'apikey': self.apikey, 'httpAccept': 'application/json'}
+            js = self._fetch('%s/%s'%(APIURI.AUTHOR, author_id), par, ('author', author_id))
+            try:
+                return _parse_author_retrieval(js)
+            except:
+                raise ValueError('Author %s not found!' %author_id)
 
-        js = r.json()
-        try:
-            return _parse_author_retrieval(js)
-        except:
-            raise ValueError('Author %s not found!' %author_id)
+        return self._memoized(('author', author_id), retrieve)
 
-    async def retrieve_abstract(self, scopus_id, download_path=None, view='FULL'):
+    def retrieve_abstract(self, scopus_id, download_path=None, view='FULL', raw=False):
         '''
             Retrieve publication abstracts
             Details: https://api.elsevier.com/documentation/AbstractRetrievalAPI.wadl
@@ -158,29 +501,35 @@ class Scopus(object):
             scopus_id : str
                 Scopus id of a publication in Scopus database.
             download_path : str
-                Where to save JSON response for this abstract retreival result. Default is None (do not save)
+                Where to save JSON response for this abstract retreival result, one file
+                per abstract. Default is None (do not save). For many abstracts, prefer
+                an archive (Scopus(archive=...)).
             view : str
                 Options: BASIC, META, META_ABS, REF, FULL (default)
+            raw : bool
+                Return the response body (JSON bytes) as received, without decoding
+                or parsing it. Default is False.
 
 
             Returns
             ----------------------------------------------------------------------
             dict
-               Dictionary of publication id, title, and abstract.
+               Dictionary of publication id, title, and abstract (bytes if raw).
         '''
 
         par = {'apikey': self.apikey, 'httpAccept': 'application/json', 'view': view}
-        r = requests.get('%s/%s'%(APIURI.ABSTRACT, scopus_id), params=par)
-        js = r.json()
-
+        r = self._request('%s/%s'%(APIURI.ABSTRACT, scopus_id), par, ('abstract', scopus_id))
 
         if download_path is not None:
             if not os.path.exists(download_path):
                 os.mkdir(download_path)
-            if not download_path.endswith('/'):
-                download_path += '/'
-            json.dump(js, open(download_path+scopus_id+'.json', 'w'))
-      
+            # the body is saved as received: no decode/encode round trip
+            with open(os.path.join(download_path, scopus_id+'.json'), 'wb') as f:
+                f.write(r.content)
+        if raw:
+            return r.content
+
+        js = self.json_decoder(r.content)
         try:
             return _parse_abstract_retrieval(js)
         except:
@@ -188,7 +537,73 @@ class Scopus(object):
             raise ValueError("API Response is %s"%r)
             raise ValueError('Abstract for %s not found!'%scopus_id ) 
 
-    def retrieve_citation(self, scopus_id_array, year_range):
+    def _retrieve_abstract_record(self, scopus_id, download_path=None, view='FULL'):
+        '''
+            retrieve_abstract for batch use: never raises, failures are reported in
+            the record under 'Retrieval Error'.
+        '''
+        try:
+            abstract_dict = self.retrieve_abstract(scopus_id, download_path=download_path, view=view)
+            abstract_dict['Retrieval Error'] = None
+        except Exception as e:
+            abstract_dict = {'Retrieval Error': '%s: %s' %(type(e).__name__, e)}
+        abstract_dict['scopus_id'] = scopus_id
+        return abstract_dict
+
+    def iter_abstracts(self, scopus_ids, workers=8, download_path=None, view='FULL'):
+        '''
+            Retrieve many abstracts concurrently, yielding them as they are parsed.
+
+            Parameters
+            ----------------------------------------------------------------------
+            scopus_ids : iterable
+                Scopus ids of publications. Consumed lazily.
+            workers : int
+                Number of abstracts fetched concurrently. Keep it within pool_size.
+            download_path : str
+                Where to save JSON responses (see retrieve_abstract).
+            view : str
+                Options: BASIC, META, META_ABS, REF, FULL (default)
+
+            Yields
+            ----------------------------------------------------------------------
+            dict
+               Parsed abstract (see retrieve_abstract) plus 'scopus_id', in input order.
+               If an abstract could not be retrieved, the dict only holds 'scopus_id' and
+               the reason under 'Retrieval Error' (None on success); the batch goes on.
+        '''
+
+        def fetch_abstract(scopus_id):
+            return self._retrieve_abstract_record(scopus_id, download_path=download_path, view=view)
+
+        for abstract_dict in self._imap(fetch_abstract, scopus_ids, workers=workers):
+            yield abstract_dict
+
+    def retrieve_abstracts(self, scopus_ids, workers=8, download_path=None, view='FULL',
+                           sink=None):
+        '''
+            Retrieve many abstracts concurrently (see iter_abstracts).
+
+            sink : str or pyscopus.sink.ParquetSink
+                Write the abstracts, as they are parsed, to this Parquet (or .arrow)
+                file or sink instead of returning them (see search).
+
+            Returns
+            ----------------------------------------------------------------------
+            pandas.DataFrame
+               One row per scopus id, in input order. Failed retrievals have a
+               non-null 'Retrieval Error'. With a sink, the number of abstracts written.
+        '''
+        if sink is not None:
+            return self._write_sink(sink, ([abstract_dict] for abstract_dict in
+                                           self.iter_abstracts(scopus_ids, workers=workers,
+                                                               download_path=download_path,
+                                                               view=view)))
+        return pd.DataFrame(list(self.iter_abstracts(scopus_ids, workers=workers,
+                                                     download_path=download_path, view=view)))
+
+    def retrieve_citation(self, scopus_id_array, year_range, workers=1,
+                          chunk_size=CITATION_CHUNK_SIZE, sink=None):
         '''
             Retrieve citation counts
             Details: https://api.elsevier.com/documentation/AbstractCitationAPI.wadl
@@ -201,27 +616,57 @@ class Scopus(object):
             year_range : array (list, tuple or np.array) of length 2
                 1st element is the start year; 2nd element is the end year. Both integers.
 
+            workers : int
+                Number of chunks requested concurrently. Keep it within pool_size.
+
+            chunk_size : int
+                Number of scopus ids per request; the API takes at most 25.
+
+            sink : str or pyscopus.sink.ParquetSink
+                Write the counts, chunk by chunk, to this Parquet (or .arrow) file or
+                sink instead of returning them (see search).
+
             Returns
             ----------------------------------------------------------------------
             pandas DataFrame
-               Data frame of citation counts over time.
+               Data frame of citation counts over time, one row per publication in
+               the order of scopus_id_array, whatever the number of chunks. Counts
+               the API does not give are <NA>; a publication missing from a
+               response altogether is a row of <NA>, with a warning.
+               With a sink, the number of publications written.
         '''
 
         date = '%i-%i' %(year_range[0], year_range[1])
+        scopus_id_array = [str(scopus_id) for scopus_id in scopus_id_array]
+
+        def fetch_chunk(start):
+            chunk_ids = scopus_id_array[start:start+chunk_size]
+            chunk = ','.join(chunk_ids)
+            par = {'apikey': self.apikey, 'scopus_id': chunk, \
+                    'httpAccept':'application/json', 'date': date}
 
-        par = {'apikey': self.apikey, 'scopus_id': ','.join(scopus_id_array), \
-                'httpAccept':'application/json', 'date': date}
+            js = self._fetch(APIURI.CITATION, par, ('citation', '%s:%s' %(date, chunk)))
 
-        r = requests.get(APIURI.CITATION, params=par)
-        js = r.json()
+            # rows follow chunk_ids, so chunks line up even if the API skips a document
+            return _parse_citation(js, year_range, chunk_ids)
 
-        return _parse_citation(js, year_range)
+        if sink is not None:
+            return self._write_sink(sink, self._imap(fetch_chunk,
+                                                     range(0, len(scopus_id_array), chunk_size),
+                                                     workers=workers), frames=True)
+
+        # every chunk has the same year columns, so they line up when stacked
+        chunk_list = self._map(fetch_chunk, range(0, len(scopus_id_array), chunk_size),
+                               workers=workers)
+        if len(chunk_list) == 0:
+            return pd.DataFrame()
+        return pd.concat(chunk_list, ignore_index=True)
 
     def retrieve_full_text(self, full_text_link):
-        r = requests.get(full_text_link, params={'apikey': self.apikey,
-                                                 'httpAccept': 'application/json'}
-                        )
-        return r.json()['full-text-retrieval-response']['originalText']
+        js = self._fetch(full_text_link, {'apikey': self.apikey,
+                                          'httpAccept': 'application/json'},
+                         ('full_text', full_text_link))
+        return js['full-text-retrieval-response']['originalText']
 
     def search_serial(self, title, view='CITESCORE', count=200):
         '''
@@ -253,8 +698,7 @@ class Scopus(object):
             view = 'CITESCORE'
         par = {'apiKey': self.apikey, 'title': title,
                 'count': count, 'view': view}
-        r = requests.get(APIURI.SERIAL_SEARCH, par)
-        return _parse_serial(r.json())
+        return _parse_serial(self._fetch(APIURI.SERIAL_SEARCH, par))
 
     def retrieve_serial(self, issn, view='CITESCORE'):
         '''
@@ -275,6 +719,7 @@ class Scopus(object):
                 - second one is the temporal citescore in each year
                 - last one is the temporal rank/percentile for each subject code in each year
             If cite score is not avaiable then the last two are empty
+            Repeated lookups are served from entity_cache, under ('serial', issn, view).
         '''
 
         if view not in ['STANDARD', 'ENHANCED', 'CITESCORE']:
@@ -282,9 +727,10 @@ class Scopus(object):
             view = 'CITESCORE'
         par = {'apiKey': self.apikey, 'view': view}
 
-        r = requests.get(APIURI.SERIAL_RETRIEVAL+issn,
-                         params=par)
-        return _parse_serial(r.json())
+        archive_key = ('serial', '%s|%s' %(issn, view))
+        return self._memoized(('serial', issn, view),
+                              lambda: _parse_serial(self._fetch(APIURI.SERIAL_RETRIEVAL+issn, par,
+                                                                archive_key)))
 
     def retrieve_affiliation(self, aff_id, view='STANDARD'):
         '''
@@ -300,12 +746,18 @@ class Scopus(object):
 
             Returns
             -------
+            dict
+                Affiliation profile. Repeated lookups are served from entity_cache,
+                under the key ('affiliation', aff_id, view).
         '''
 
-        par = {'apiKey': self.apikey, 'view': view, 'httpAccept': 'application/json'}
+        def retrieve():
+            par = {'apiKey': self.apikey, 'view': view, 'httpAccept': 'application/json'}
+
+            archive_key = ('affiliation', '%s|%s' %(aff_id, view))
+            js = self._fetch(APIURI.AFFL_RETRIEVAL+aff_id, par, archive_key)
+            d = _parse_aff(js['affiliation-retrieval-response'])
+            d['aff_id'] = aff_id
+            return d
 
-        r = requests.get(APIURI.AFFL_RETRIEVAL+aff_id,
-                         params=par)
-        d = _parse_aff(r.json()['affiliation-retrieval-response'])
-        d['aff_id'] = aff_id
-        return d
+        return self._memoized(('affiliation', aff_id, view), retrieve)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+'''
+    Columnar file sinks (Parquet, Arrow) for parsed records
+'''
+
+import warnings
+
+from pyscopus.frame import SEARCH_DTYPES
+from pyscopus.lazy import LazyModule, lazy_import
+from pyscopus.utils import _ARTICLE_SCHEMA, _RecordColumns
+
+pa = lazy_import('pyarrow')
+pc = LazyModule('pyarrow.compute')
+pq = LazyModule('pyarrow.parquet')
+
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+# arrow types of the numeric and date dtypes of frame.SEARCH_DTYPES. Categorical
+# columns stay strings: Parquet dictionary-encodes them anyway, and an Arrow IPC
+# file cannot take a new dictionary with every batch.
+_ARROW_TYPES = {'Int16': 'int16', 'Int32': 'int32', 'Int64': 'int64', 'date': 'date32'}
+
+def search_schema(type_=1):
+    '''
+        Arrow schema of the records of a document (type_ 1) or author (type_ 2)
+        search: years, counts and dates are typed as with typed=True (see
+        frame.SEARCH_DTYPES), the rest are strings
+    '''
+    if pa is None:
+        raise ImportError('search_schema requires pyarrow (pip install pyarrow)')
+    is_document = type_ == 1 or type_ == 'article'
+    if is_document:
+        column_list = ['Link']
+        for column in _ARTICLE_SCHEMA.columns:
+            column_list.extend(column if isinstance(column, tuple) else [column])
+        column_list.append('User Exception')
+        types = {'User Exception': pa.list_(pa.string())}
+    else:
+        column_list = ['author_id', 'name', 'document_count', 'affiliation', 'affiliation_id']
+        types = dict()
+    for column, dtype in SEARCH_DTYPES[1 if is_document else 2].items():
+        if dtype in _ARROW_TYPES:
+            types[column] = getattr(pa, _ARROW_TYPES[dtype])()
+    return pa.schema([(column, types.get(column, pa.string())) for column in column_list])
+
+def _as_strings(values):
+    # values (or list items) that arrow could not convert, as strings
+    if any(isinstance(v, list) for v in values):
+        return pa.array([None if v is None else [None if x is None else str(x) for x in v]
+                         for v in values], type=pa.list_(pa.string()))
+    return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+def _infer_array(values):
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _as_strings(values)
+    if pa.types.is_null(array.type):
+        return array.cast(pa.string())
+    if pa.types.is_list(array.type) and pa.types.is_null(array.type.value_type):
+        return array.cast(pa.list_(pa.string()))
+    return array
+
+def _as_int(value, limit):
+    # value as an int within +-limit, None if it is not one (as pandas.to_numeric
+    # with errors='coerce' and a nullable integer dtype would have it)
+    try:
+        number = int(value)
+    except (ValueError, TypeError):
+        try:
+            number = float(value)
+        except (ValueError, TypeError):
+            return None
+        if not number.is_integer():
+            return None
+        number = int(number)
+    return number if -limit <= number < limit else None
+
+def _parse_array(values, type_):
+    # numbers and dates given as text, converted as frame.typed_frame does:
+    # values that do not parse become null
+    text = _as_strings(values)
+    if pa.types.is_date(type_):
+        return pc.strptime(text, format='%Y-%m-%d', unit='s', error_is_null=True).cast(type_)
+    try:
+        return pc.cast(text, type_)
+    except pa.ArrowInvalid:
+        limit = 1 << (type_.bit_width - 1)
+        return pa.array([_as_int(value, limit) for value in values], type=type_)
+
+def _conform_array(values, type_):
+    try:
+        return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if type_ == pa.string() or type_ == pa.list_(pa.string()):
+            return _as_strings(values)
+        if pa.types.is_signed_integer(type_) or pa.types.is_date(type_):
+            return _parse_array(values, type_)
+        raise
+
+class ParquetSink(object):
+    '''
+        Writes parsed records to a Parquet file, or an Arrow IPC file if path ends
+        with .arrow/.feather/.ipc, one record batch (row group) at a time, so that
+        memory stays bounded however many records go through.
+
+        The schema is the one given, or else inferred from the first batch
+        (columns that are all null are taken as strings). Later records are
+        conformed to it: missing columns are null, values that do not fit a
+        string column are converted with str, text in an integer or date column
+        is parsed (null if it does not parse, as with typed=True), and columns
+        the schema does not have are dropped with a warning.
+
+        Parameters
+        ----------
+        path : str
+            Output file. Overwritten.
+        schema : pyarrow.Schema
+            Schema of the file. Default is None (inferred).
+        batch_size : int
+            Number of records per record batch / row group.
+        compression : str
+            Compression codec, e.g. 'zstd' (default), 'snappy', 'lz4' or None.
+    '''
+
+    def __init__(self, path, schema=None, batch_size=10000, compression='zstd'):
+        if pa is None:
+            raise ImportError('ParquetSink requires pyarrow (pip install pyarrow)')
+        self.path = path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.compression = compression
+        self.rows = 0
+        self._buffer = list()
+        self._writer = None
+        self._dropped = set()
+
+    def write(self, records):
+        '''
+            Add records (dicts); full batches are written out
+        '''
+        self._buffer.extend(records)
+        while len(self._buffer) >= self.batch_size:
+            batch = self._buffer[:self.batch_size]
+            self._buffer = self._buffer[self.batch_size:]
+            self._write_table(self._to_table(batch))
+
+    def write_frame(self, df):
+        '''
+            Write a data frame as it is (after the records already added)
+        '''
+        self.flush()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.schema is not None:
+            table = table.cast(self.schema)
+        self._write_table(table)
+
+    def flush(self):
+        if len(self._buffer) > 0:
+            self._write_table(self._to_table(self._buffer))
+            self._buffer = list()
+
+    def _to_table(self, records):
+        columns = _RecordColumns(records).columns
+        n = len(records)
+        if self.schema is None:
+            return pa.table({name: _infer_array(values) for name, values in columns.items()})
+        extra = set(columns) - set(self.schema.names) - self._dropped
+        if len(extra) > 0:
+            warnings.warn('Columns not in the schema of %s dropped: %s'
+                          %(self.path, ', '.join(sorted(extra))), UserWarning)
+            self._dropped.update(extra)
+        return pa.Table.from_arrays([_conform_array(columns.get(field.name, [None]*n), field.type)
+                                     for field in self.schema], schema=self.schema)
+
+    def _write_table(self, table):
+        if self._writer is None:
+            self.schema = table.schema
+            self._open()
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def _open(self):
+        if self.path.endswith(ARROW_SUFFIXES):
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self.path, self.schema, options=options)
+        else:
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+
+    def close(self):
+        '''
+            Write the remaining records and close the file (an empty one if nothing
+            was written but the schema is known)
+        '''
+        self.flush()
+        if self._writer is None and self.schema is not None:
+            self._open()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+'''
+    Normalized author-document tables of document search results
+'''
+
+from pyscopus.lazy import LazyModule
+from pyscopus.utils import _ENTRY_AUTHOR_SCHEMA, _ENTRY_AFFILIATION_SCHEMA
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+def _ids(values):
+    # Scopus ids (numeric strings) as nullable 64-bit integers; numpy parses
+    # well-formed ids several times faster than to_numeric, which handles the rest
+    try:
+        return pd.array(np.array(values, dtype=np.int64), dtype='Int64')
+    except (ValueError, TypeError, OverflowError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').astype('Int64').array
+
+class _LinkColumns(object):
+    '''
+        Columnar accumulator of the authorships of search entries (see
+        _parse_article_links), keyed by document number: the row of the
+        document in the search results.
+    '''
+
+    def __init__(self):
+        self.doc = []
+        self.author_id = []
+        self.position = []
+        self.affiliation_doc = []
+        self.affiliation_author_id = []
+        self.affiliation_id = []
+        # first record seen of every author and affiliation, by id
+        self.authors = dict()
+        self.affiliations = dict()
+
+    def add(self, doc, links):
+        authorship_list, affiliation_list = links
+        authors = self.authors
+        for author_id, position, afid_list, author in authorship_list:
+            self.doc.append(doc)
+            self.author_id.append(author_id)
+            self.position.append(position)
+            for afid in afid_list:
+                self.affiliation_doc.append(doc)
+                self.affiliation_author_id.append(author_id)
+                self.affiliation_id.append(afid)
+            if author_id not in authors:
+                authors[author_id] = _ENTRY_AUTHOR_SCHEMA(author)
+        for affiliation in affiliation_list:
+            afid = affiliation.get('afid')
+            if afid is not None and afid not in self.affiliations:
+                self.affiliations[afid] = _ENTRY_AFFILIATION_SCHEMA(affiliation)
+
+    def to_frames(self, documents):
+        '''
+            Dict of data frames: documents, authorships, author_affiliations,
+            authors and affiliations (see Scopus.search, tables=True)
+        '''
+        authorships = pd.DataFrame({'doc': np.array(self.doc, dtype=np.int32),
+                                    'author_id': _ids(self.author_id),
+                                    'position': pd.array(self.position, dtype='Int16')})
+        author_affiliations = pd.DataFrame({'doc': np.array(self.affiliation_doc, dtype=np.int32),
+                                            'author_id': _ids(self.affiliation_author_id),
+                                            'affiliation_id': _ids(self.affiliation_id)})
+        authors = pd.DataFrame(list(self.authors.values()),
+                               columns=['author_id', 'name', 'surname', 'given_name', 'initials'])
+        authors['author_id'] = _ids(authors['author_id'])
+        affiliations = pd.DataFrame(list(self.affiliations.values()),
+                                    columns=['affiliation_id', 'name', 'city', 'country'])
+        affiliations['affiliation_id'] = _ids(affiliations['affiliation_id'])
+        return {'documents': documents,
+                'authorships': authorships,
+                'author_affiliations': author_affiliations.drop_duplicates(ignore_index=True),
+                'authors': authors,
+                'affiliations': affiliations}
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+'''
+    HTTP transport used by the Scopus client
+'''
+
+import json
+
+from pyscopus.lazy import LazyModule, lazy_import
+
+requests = LazyModule('requests')
+requests_adapters = LazyModule('requests.adapters')
+orjson = lazy_import('orjson')
+
+DEFAULT_HEADERS = {'Accept': 'application/json',
+                   'Accept-Encoding': 'gzip, deflate',
+                   'Connection': 'keep-alive'}
+
+def default_json_decoder():
+    '''
+        Fastest JSON decoder available: orjson.loads if orjson is installed,
+        json.loads otherwise. Either takes the response bytes as they are.
+    '''
+    if orjson is not None:
+        return orjson.loads
+    return json.loads
+
+class ScopusHTTPError(ValueError):
+    '''
+        Error response (HTTP status >= 400) from the Scopus API
+    '''
+
+    def __init__(self, message, status_code=None):
+        ValueError.__init__(self, message)
+        self.status_code = status_code
+
+def check_status(url, status_code, content):
+    '''
+        Raise ScopusHTTPError for an error response, with the reason Elsevier gives in its body
+    '''
+    if status_code < 400:
+        return
+    try:
+        js = json.loads(content)
+        if 'service-error' in js:
+            status = js['service-error']['status']
+            reason = '%s %s' %(status.get('statusCode', ''), status.get('statusText', ''))
+        else:
+            reason = js['error-response']['error-message']
+    except Exception:
+        reason = content[:200]
+        if isinstance(reason, bytes):
+            reason = reason.decode('utf-8', 'replace')
+    raise ScopusHTTPError('Scopus API returned HTTP %i for %s: %s' %(status_code, url, reason),
+                          status_code=status_code)
+
+class Response(object):
+    '''
+        Minimal stand-in for requests.Response: a response already read into memory
+        (from the cache, or from an asynchronous request)
+    '''
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+class Transport(object):
+    '''
+        Pooled, keep-alive HTTP transport.
+
+        One requests.Session is shared by every call made through the transport,
+        so TCP/TLS connections to api.elsevier.com are reused instead of being
+        opened for each request. Any object exposing the same ``get`` method can
+        be handed to Scopus instead.
+
+        Parameters
+        ----------
+        pool_size : int
+            Number of connections kept alive per host. Set it to at least the
+            number of threads issuing requests concurrently.
+        timeout : float or tuple
+            Connect/read timeout in seconds passed on to requests.
+        max_retries : int
+            Number of retries on connection errors (not on HTTP errors).
+        headers : dict
+            Extra headers sent with every request.
+    '''
+
+    def __init__(self, pool_size=10, timeout=30, max_retries=0, headers=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers is not None:
+            self.session.headers.update(headers)
+        adapter = requests_adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=max_retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, params=None, headers=None):
+        '''
+            Issue a GET request over the pooled session.
+
+            Parameters
+            ----------
+            url : str
+                Request URL.
+            params : dict
+                Query parameters.
+            headers : dict
+                Per-request headers, merged with the session headers.
+
+            Returns
+            -------
+            requests.Response
+        '''
+        return self.session.get(url, params=params, headers=headers,
+                                timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -3,43 +3,39 @@
     Helper Functions
 '''
 
-import requests
-import numpy as np
-import pandas as pd
 import urllib.parse
-import collections
+import warnings
 import json
 import traceback
 
+from pyscopus.lazy import LazyModule
+from pyscopus.schema import compile_schema, Join
+
+requests = LazyModule('requests')
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+def _format_date_created(date_entry):
+    try:
+        return '{}/{}/{}'.format(*[date_entry[k] for k in sorted(date_entry)])
+    except (IndexError, TypeError, AttributeError):
+        return None
+
+_AFF_SCHEMA = compile_schema([
+    ('eid', ('coredata', 'eid')),
+    ('affiliation-name', 'affiliation-name'),
+    ('address', 'address'),
+    ('city', 'city'),
+    ('country', 'country'),
+    ('org-type', ('institution-profile', 'org-type')),
+    ('org-domain', ('institution-profile', 'org-domain')),
+    ('org-URL', ('institution-profile', 'org-URL')),
+    ('date-created', ('institution-profile', 'date-created'), _format_date_created),
+])
+
 def _parse_aff(js_aff):
     ''' example: https://dev.elsevier.com/payloads/retrieval/affiliationRetrievalResp.xml'''
-    try:
-        d = {'eid': js_aff['coredata']['eid']}
-    except:
-        d = {'eid': None}
-    ## affiliation-name
-    try:
-        d['affiliation-name'] = js_aff['affiliation-name']
-    except:
-        d['affiliation-name'] = None
-    ## address
-    for add_type in ['address', 'city', 'country']:
-        try:
-            d[add_type] = js_aff[add_type]
-        except:
-            d[add_type] = None
-    ## institution-profile
-    for org_type in ['org-type', 'org-domain', 'org-URL']:
-        try:
-            d[org_type] = js_aff['institution-profile'][org_type]
-        except:
-            d[org_type] = None
-    date_entry = js_aff['institution-profile']['date-created']
-    try:
-        d['date-created'] = '{}/{}/{}'.format(*[date_entry[k] for k in sorted(date_entry)])
-    except:
-        d['date-created'] = None
-    return d
+    return _AFF_SCHEMA(js_aff)
 
 
 def _parse_serial_citescore(serial_entry_citescore):
@@ -97,45 +93,51 @@ def _parse_serial(serial_json):
 
 from pyscopus import APIURI
 
-def _parse_citation(js_citation, year_range):
+def _parse_citation(js_citation, year_range, scopus_ids=None):
+    '''
+        Citation counts of a Citation Overview response, one row per document.
+        Given the scopus ids requested, the rows are those ids in that order, and
+        a document missing from the response is a row of <NA> (with a warning).
+    '''
     resp = js_citation['abstract-citations-response']
     cite_info_list = resp['citeInfoMatrix']['citeInfoMatrixXML']['citationMatrix']['citeInfo']
-
-    year_range = (year_range[0], year_range[1]+1)
-    columns = ['scopus_id', 'previous_citation'] + [str(yr) for yr in range(*year_range)] + ['later_citation', 'total_citation']
-    citation_df = pd.DataFrame(columns=columns)
-
-    year_arr = np.arange(year_range[0], year_range[1]+1)
-    for cite_info in cite_info_list:
-        cite_dict = {}
+    if isinstance(cite_info_list, dict):
+        cite_info_list = [cite_info_list]
+    if scopus_ids is not None:
+        cite_info_by_id = {cite_info['dc:identifier'].split(':')[-1]: cite_info
+                           for cite_info in cite_info_list}
+        missing_list = [sid for sid in scopus_ids if sid not in cite_info_by_id]
+        if len(missing_list) > 0:
+            warnings.warn('No citation counts returned for %s' %', '.join(missing_list), UserWarning)
+        cite_info_list = [cite_info_by_id.get(sid, {'dc:identifier': sid}) for sid in scopus_ids]
+
+    year_list = [str(yr) for yr in range(year_range[0], year_range[1]+1)]
+    columns = ['scopus_id', 'previous_citation'] + year_list + ['later_citation', 'total_citation']
+    n_year = len(year_list)
+
+    # documents x (previous, years..., later, total): counts are written straight
+    # into one preallocated matrix, and the data frame is built from it at the end
+    count_matrix = np.full((len(cite_info_list), n_year+3), np.nan)
+    scopus_id_list = list()
+    for i, cite_info in enumerate(cite_info_list):
         # dc:identifier: scopus id
-        cite_dict['scopus_id'] = cite_info['dc:identifier'].split(':')[-1]
-        # pcc: previous citation counts
-        try:
-            cite_dict['previous_citation'] = cite_info['pcc']
-        except:
-            cite_dict['previous_citation'] = pd.np.NaN
-        # cc: citation counts during year range
-        try:
-            cc = cite_info['cc']
-        except:
-            return pd.DataFrame()
-        for index in range(len(cc)):
-            year = str(year_arr[index])
-            cite_dict[year] = cc[index]['$']
-        # lcc: later citation counts
-        try:
-            cite_dict['later_citation'] = cite_info['lcc']
-        except:
-            cite_dict['later_citation'] = pd.np.NaN
-        # rowTotal: total citation counts
-        try:
-            cite_dict['total_citation'] = cite_info['rowTotal']
-        except:
-            cite_dict['total_citation'] = pd.np.NaN
-        citation_df = citation_df.append(cite_dict, ignore_index=True)
-
-    return citation_df[columns]
+        scopus_id_list.append(cite_info['dc:identifier'].split(':')[-1])
+        # cc: citation counts during year range; without it the year cells
+        # stay missing, the other documents are unaffected
+        cc = cite_info.get('cc')
+        if cc is not None:
+            if isinstance(cc, dict):
+                cc = [cc]
+            n = min(len(cc), n_year)
+            count_matrix[i, 1:n+1] = [float(cc[k]['$']) for k in range(n)]
+        # pcc: previous citation counts; lcc: later citation counts; rowTotal: total citation counts
+        for j, key in ((0, 'pcc'), (n_year+1, 'lcc'), (n_year+2, 'rowTotal')):
+            if key in cite_info:
+                count_matrix[i, j] = float(cite_info[key])
+
+    citation_df = pd.DataFrame(count_matrix, columns=columns[1:]).astype('Int64')
+    citation_df.insert(0, 'scopus_id', scopus_id_list)
+    return citation_df
 
 def _parse_affiliation(js_affiliation):
     affString =""
@@ -175,40 +177,23 @@ def _parse_affiliation(js_affiliation):
         l.append({'name': name, 'city': city, 'country': country})
     return l """
 
-def _parse_author_affiliation(js_affiliation_entry):
-    affiliation_dict = {}
-
-    ip_doc = js_affiliation_entry['ip-doc']
-    try:
-        affiliation_dict['parent-id'] = js_affiliation_entry['@parent']
-    except:
-        affiliation_dict['parent-id'] = None
-
-    try:
-        affiliation_dict['id'] = ip_doc['@id']
-    except:
-        affiliation_dict['id'] = None
-
+def _join_address(address):
     try:
-        affiliation_dict['parent-name'] = ip_doc['parent-preferred-name']
-    except:
-        affiliation_dict['parent-name'] = None
+        return ', '.join(address.values())
+    except (AttributeError, TypeError):
+        return None
 
-    try:
-        affiliation_dict['name'] = ip_doc['afdispname']
-    except:
-        affiliation_dict['name'] = None
+_AUTHOR_AFFILIATION_SCHEMA = compile_schema([
+    ('parent-id', '@parent'),
+    ('id', ('ip-doc', '@id')),
+    ('parent-name', ('ip-doc', 'parent-preferred-name')),
+    ('name', ('ip-doc', 'afdispname')),
+    ('address', ('ip-doc', 'address'), _join_address),
+    ('url', ('ip-doc', 'org-URL')),
+])
 
-    try:
-        affiliation_dict['address'] = ', '.join(ip_doc['address'].values())
-    except:
-        affiliation_dict['address'] = None
-
-    try:
-        affiliation_dict['url'] = ip_doc['org-URL']
-    except:
-        affiliation_dict['url'] = None
-    return affiliation_dict
+def _parse_author_affiliation(js_affiliation_entry):
+    return _AUTHOR_AFFILIATION_SCHEMA(js_affiliation_entry)
 
 def _parse_affiliation_history(js_affiliation_history):
     columns = ('id', 'name', 'parent-id', 'parent-name', 'url')
@@ -244,181 +229,158 @@ def _parse_author(entry):
     #country = affil.find('affiliation-country').text
     #affiliation = institution + ', ' + city + ', ' + country
 
-    return pd.Series({'author_id': author_id, 'name': firstname + ' ' + lastname, 'document_count': doc_count,\
-            'affiliation': institution_name, 'affiliation_id': institution_id})
+    return {'author_id': author_id, 'name': firstname + ' ' + lastname, 'document_count': doc_count,\
+            'affiliation': institution_name, 'affiliation_id': institution_id}
+
+def _subject_areas(subject_area):
+    # {abbreviation: number of documents} of an author's subject areas
+    if not isinstance(subject_area, list):
+        subject_area = [subject_area]
+    subjects = dict()
+    for subject in subject_area:
+        if isinstance(subject, dict) and subject.get('@abbrev') is not None:
+            frequency = subject.get('@frequency')
+            subjects[subject['@abbrev']] = int(frequency) if frequency else 1
+    return subjects
+
+# author search entry with what disambiguation needs beyond _parse_author
+_AUTHOR_CANDIDATE_SCHEMA = compile_schema([
+    ('author_id', 'dc:identifier', lambda s: s.split(':')[-1]),
+    ('surname', ('preferred-name', 'surname')),
+    ('given_name', ('preferred-name', 'given-name')),
+    ('document_count', 'document-count', int, 0),
+    ('affiliation_id', ('affiliation-current', 'affiliation-id')),
+    ('affiliation', ('affiliation-current', 'affiliation-name')),
+    ('city', ('affiliation-current', 'affiliation-city')),
+    ('country', ('affiliation-current', 'affiliation-country')),
+    ('subjects', 'subject-area', _subject_areas),
+])
+
+def _split_page_range(pagerange):
+    # '12-18' -> ('12', '18', 6); anything else -> no page information
+    try:
+        page_start, page_end = pagerange.split('-')[:2]
+        return page_start, page_end, int(page_end) - int(page_start)
+    except (AttributeError, ValueError):
+        return None, None, None
+
+_ARTICLE_SCHEMA = compile_schema([
+    ('Authors_ID', 'author', Join('; ', 'authid')),
+    ('Pubmed_ID_Scopus', 'pubmed-id'),
+    ('EID', 'eid'),
+    ('Art No', 'article-number'),
+    ('Issue', 'prism:issueIdentifier'),
+    ('Access Type', ('freetoreadLabel', 'value'), Join(', ')),
+    (('Page start', 'Page end', 'Page count'), 'prism:pageRange', _split_page_range),
+    ('Year', 'prism:coverDate', lambda d: d.split('-')[0] if d else None),
+    ('Cover Date', 'prism:coverDate'),
+    ('scopus-id', 'dc:identifier', lambda s: s.split(':')[-1] if s is not None else None),
+    ('Pub_Title', 'dc:title'),
+    ('Source_Title', 'prism:publicationName'),
+    ('ISSN', 'prism:issn', Join(', ')),
+    ('ISBN', 'prism:isbn', Join(', ')),
+    ('Volume', 'prism:volume'),
+    ('DOI', 'prism:doi'),
+    ('Cited by', 'citedby-count'),
+    ('Document', 'prism:aggregationType'),
+    ('Document Type', 'subtypeDescription'),
+])
 
 def _parse_article(entry):
-    user_defined_exception_list=[]
-
-
-    try:
-        eid = entry['eid']
-    except:
-        eid = None
-        uException = "There are no results"
-        user_defined_exception_list.append(uException)
-        return  pd.Series(uException)
-
-    try:
-        scopus_id = entry['dc:identifier'].split(':')[-1]
-    except:
-        scopus_id = None
-        uException = "Scopus Id  not available for %s"%eid
-        user_defined_exception_list.append(uException)  
-   
-    try:
-        pubmed_id = entry['pubmed-id']
-    except:
-        pubmed_id = None
-    try:
-        issue = entry['prism:issueIdentifier']
-    except:
-        issue = None
-    try:
-        title = entry['dc:title']
-    except:
-        title = None
-    try:
-        publicationname = entry['prism:publicationName']
-    except:
-        publicationname = None
-    try:
-        issn =""
-        pissn = entry['prism:issn']
-        if(isinstance(pissn, list)):
-            for i in pissn:
-                if "$" in i:
-                    if(len(issn) != 0):
-                        issn = issn +', '
-                    issn = issn + i["$"]
-        else:
-            issn = pissn            
-    except:
-        issn = None
-    try:
-        isbn =""
-        pisbn = entry['prism:isbn']
-        if(isinstance(pisbn, list)):
-            for i in pisbn:
-                if "$" in i:
-                    if(len(isbn) != 0):
-                        isbn = isbn +', '
-                    isbn = isbn + i["$"]
-        else:
-            isbn = pisbn
-    except:
-        isbn = None
-  
-    try:
-        volume = entry['prism:volume']
-    except:
-        volume = None
-    try:
-        pagerange = entry['prism:pageRange']
-        if pagerange is not None and len(pagerange)>0:
-            pageStart = pagerange.split('-')[0]
-            pageEnd = pagerange.split('-')[1]
-        else:
-            pageStart = None
-            pageEnd =None
-        if pageStart is not None and pageEnd is not None:
-            pageCount = int(pageEnd) - int(pageStart)
-        else:
-            pageCount = None
-    except:
-        pagerange = None
-        pageStart = None
-        pageEnd = None
-        pageCount = None        
-    try:
-        coverdate = entry['prism:coverDate']
-        if coverdate is not None and len(coverdate)>0:
-            year = coverdate.split('-')[0]
-        else:
-            year = None
-            coverdate = None
-    except:
-        coverdate = None
-        year =None
-  
-    try:
-        doi = entry['prism:doi']
-    except:
-        doi = None
-        # uException = "DOI  not available for %s"%eid
-        # user_defined_exception_list.append(uException)  
-    try:
-        citationcount = entry['citedby-count']
-    except:
-        citationcount = None
-    
-    try:
-        aggregationtype = entry['prism:aggregationType']
-    except:
-        aggregationtype = None
-    try:
-        sub_dc = entry['subtypeDescription']
-    except:
-        sub_dc = None
-    try:
-        author_entry = entry['author']
-        #author_id_list = [auth_entry['authid'] for auth_entry in author_entry]
-        author_id_list = ""
-        for i in author_entry:
-            if "authid" in i:
-                temp = i["authid"]
-                if(len(author_id_list) != 0):
-                    author_id_list = author_id_list +'; '
-                author_id_list = author_id_list+temp   
-    except:
-        author_id_list = None
-    # try:
-    #     link_list = entry['link']
-    #     full_text_link = None
-    #     for link in link_list:
-    #         if link['@ref'] == 'full-text':
-    #             full_text_link = link['@href']
-    # except:
-    #     full_text_link = None
-
-    try:
-        art_no = entry['article-number']
-    except:
-        art_no = None
-
-    try:
-        freetoreadLabel = entry['freetoreadLabel']
-        open_access = ""
-        valueList = freetoreadLabel["value"]
-        for i in valueList:
-            temp = i["$"]
-            if(len(open_access) != 0):
-                open_access = open_access +', '
-            open_access = open_access+temp           
-    except:
-        open_access = None
+    if 'eid' not in entry:
+        return {'User Exception': ["There are no results"]}
+    eid = entry['eid']
+    doi = entry.get('prism:doi')
+    if doi is not None:
+        link = APIURI.SCOPUS_URL+eid+"&doi="+doi+"&partnerID=40"
+    else:
+        link = APIURI.SCOPUS_URL+eid+"&partnerID=40"
+
+    record = _ARTICLE_SCHEMA(entry, {'Link': link})
+    user_defined_exception_list = []
+    if record['scopus-id'] is None:
+        user_defined_exception_list.append("Scopus Id  not available for %s"%eid)
+    record['User Exception'] = user_defined_exception_list
+    return record
+
+# author and affiliation records of a search entry (COMPLETE view)
+_ENTRY_AUTHOR_SCHEMA = compile_schema([
+    ('author_id', 'authid'),
+    ('name', 'authname'),
+    ('surname', 'surname'),
+    ('given_name', 'given-name'),
+    ('initials', 'initials'),
+])
+
+_ENTRY_AFFILIATION_SCHEMA = compile_schema([
+    ('affiliation_id', 'afid'),
+    ('name', 'affilname'),
+    ('city', 'affiliation-city'),
+    ('country', 'affiliation-country'),
+])
+
+def _parse_article_links(entry):
+    '''
+        Authorships of a search entry (COMPLETE view: the STANDARD view has no
+        authors) as (author id, position, affiliation ids, author) tuples, and
+        its affiliations. The author and affiliation dicts are left as they are
+        for _ENTRY_AUTHOR_SCHEMA/_ENTRY_AFFILIATION_SCHEMA: most authors and
+        affiliations recur across documents and only need parsing once.
+    '''
+    author_list = entry.get('author') or []
+    if not isinstance(author_list, list):
+        author_list = [author_list]
+    authorship_list = []
+    for i, author in enumerate(author_list):
+        if author.get('authid') is None:
+            continue
+        seq = author.get('@seq')
+        afid_list = author.get('afid') or []
+        if not isinstance(afid_list, list):
+            afid_list = [afid_list]
+        authorship_list.append((author['authid'],
+                                int(seq) if seq is not None and seq.isdigit() else i+1,
+                                [afid['$'] if isinstance(afid, dict) else afid
+                                 for afid in afid_list],
+                                author))
+    affiliation_list = entry.get('affiliation') or []
+    if not isinstance(affiliation_list, list):
+        affiliation_list = [affiliation_list]
+    return authorship_list, affiliation_list
+
+class _RecordColumns(object):
+    '''
+        Columnar accumulator of parsed records (dicts): one list per field, so that
+        a data frame is built once from plain lists rather than row by row.
+        Fields missing from a record are filled with None.
+    '''
 
-    try:
-        if doi is not None: 
-            Link = APIURI.SCOPUS_URL+eid+"&doi="+doi+"&partnerID=40"
-        else:
-            Link = APIURI.SCOPUS_URL+eid+"&partnerID=40"
-        #Link = urllib.parse.urlencode(linkString)
-    except:
-        Link = None        
-
-    return pd.Series({'Link':Link,'Authors_ID': author_id_list,'Pubmed_ID_Scopus':pubmed_id,\
-                      'EID':eid,'Art No': art_no,'Issue':issue, 'Access Type':open_access,\
-            'Page start': pageStart, 'Page end': pageEnd, 'Page count':pageCount,\
-            #'page_range': pagerange,'cover_date': coverdate, 'eissn': eissn,'Authors':author_name_list,"Authors with affiliations":author_with_affiliation_string,'Affiliations': affiliation,
-            'Year':year,\
-            'scopus-id': scopus_id,\
-            'Pub_Title': title, 'Source_Title':publicationname,\
-            'ISSN': issn, 'ISBN': isbn,  'Volume': volume,\
-             'DOI': doi,'Cited by': citationcount, \
-            'Document': aggregationtype, 'Document Type': sub_dc, 'User Exception':user_defined_exception_list\
-            #'full_text': full_text_link
-            })
+    def __init__(self, records=()):
+        self.columns = dict()
+        self.length = 0
+        self.extend(records)
+
+    def __len__(self):
+        return self.length
+
+    def append(self, record):
+        columns = self.columns
+        for field, value in record.items():
+            if field not in columns:
+                columns[field] = [None]*self.length
+            columns[field].append(value)
+        self.length += 1
+        if len(record) != len(columns):
+            for column in columns.values():
+                if len(column) < self.length:
+                    column.append(None)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns)
 
 def _parse_entry(entry, type_):
     if type_ == 1 or type_ == 'article':
@@ -490,6 +452,119 @@ def _parse_author_retrieval(author_entry):
 #     return affiliation_text
 
 
+def _author_keywords(citation_info):
+    keywords = citation_info.get('author-keywords', {}).get('author-keyword', '')
+    if isinstance(keywords, dict):
+        return keywords.get('$', '')
+    return Join('; ')(keywords)
+
+_ABSTRACT_HEAD_SCHEMA = compile_schema([
+    ('Abbreviated Source Title', ('source', 'sourcetitle-abbrev')),
+    ('CODEN', ('source', 'codencode')),
+    ('Author Keywords', 'citation-info', _author_keywords),
+])
+
+_ADDRESS_PARTS = ('address-part', 'city', 'state', 'postalcode', 'country')
+
+def _author_group_affiliation(affiliation):
+    # text of an author-group affiliation, None if it has none
+    if "ce:source-text" in affiliation:
+        return affiliation["ce:source-text"]
+    if "organization" in affiliation:
+        organization = affiliation["organization"]
+        if isinstance(organization, list):
+            parts = [org["$"] for org in organization]
+        else:
+            parts = [organization["$"]]
+        parts.extend([affiliation[part] for part in _ADDRESS_PARTS if part in affiliation])
+        return ', '.join(parts)
+    if "ce:text" in affiliation:
+        return affiliation["ce:text"]
+    return None
+
+def _seq_key(seq):
+    return (0, int(seq), seq) if seq.isdigit() else (1, 0, seq)
+
+def _assemble_authors(author_group, eid, user_defined_exception_list):
+    '''
+        Authors, affiliations and collaborations of an abstract's author groups,
+        gathered in one pass: the affiliations of each author (by @seq) are
+        listed as they come (one per author group, repeats included), the
+        distinct affiliations of the document are an insertion-ordered dict
+        used as an ordered set, and every string is built with join.
+    '''
+    if not isinstance(author_group, list):
+        author_group = [author_group]
+    collaboration_list = []
+    author_names = dict()
+    author_affiliations = dict()
+    affiliation_text = ""
+    for group in author_group:
+        if "collaboration" in group:
+            collaboration = group["collaboration"]
+            if "ce:indexed-name" in collaboration:
+                collaboration_list.append(collaboration["ce:indexed-name"])
+            elif "ce:text" in collaboration:
+                collaboration_list.append(collaboration["ce:text"])
+            continue
+        if "affiliation" in group:
+            affiliation_text = _author_group_affiliation(group["affiliation"])
+            if affiliation_text is None:
+                affiliation_text = ""
+                user_defined_exception_list.append("Affiliation organization/ce:source-text/ce:text not available for %s"%eid)
+        elif len(collaboration_list) == 0:
+            # authors of this group keep the affiliation of the previous one
+            user_defined_exception_list.append("Affiliation  not available for %s"%eid)
+
+        if "author" in group:
+            author_list = group["author"]
+            if not isinstance(author_list, list):
+                author_list = [author_list]
+            for author in author_list:
+                seq = author["@seq"].lower()
+                author_names[seq] = author["ce:indexed-name"]
+                author_affiliations.setdefault(seq, []).append(affiliation_text)
+        elif len(collaboration_list) == 0:
+            user_defined_exception_list.append("Author not available for %s"%eid)
+
+    # authors are numbered 1..n by @seq
+    n_authors = len(author_names)
+    name_list = []
+    with_affiliation_list = []
+    first_author_affiliation = last_author_affiliation = ""
+    for k in range(1, n_authors+1):
+        seq = str(k)
+        if seq in author_names:
+            name_list.append(author_names[seq])
+            with_affiliation_list.append(', '.join([author_names[seq]] + author_affiliations[seq]))
+        else:
+            user_defined_exception_list.append("For Seq ID %s, Author and Affiliation didn't Match. EID is  %s" %(seq,eid))
+        if k == 1:
+            if seq in author_affiliations:
+                first_author_affiliation = ', '.join(author_affiliations[seq])
+            else:
+                user_defined_exception_list.append("First Author and Affiliation didn't Match. EID is  %s" %eid)
+        if k == n_authors:
+            if seq in author_affiliations:
+                last_author_affiliation = ', '.join(author_affiliations[seq])
+            else:
+                user_defined_exception_list.append("Last Author and Affiliation didn't Match. EID is  %s" %eid)
+
+    # distinct affiliations, in author order
+    affiliation_set = dict()
+    for seq in sorted(author_affiliations, key=_seq_key):
+        affiliation_set.update(dict.fromkeys(author_affiliations[seq]))
+    author_with_affiliation_str = '; '.join(with_affiliation_list)
+    if len(collaboration_list) != 0:
+        author_with_affiliation_str = author_with_affiliation_str + "; " + ', '.join(collaboration_list)
+
+    return {'Authors': ', '.join(name_list),
+            'Affiliations': '; '.join(affiliation_set),
+            'Authors with affiliations': author_with_affiliation_str,
+            'HT_NCEHATSDR_Lead': first_author_affiliation,
+            'HT_NCEHATSDR_Senior': last_author_affiliation}
+
+
 def _parse_abstract_retrieval(abstract_entry):
     
     # nceh_affiliations=["NCEH", "National Center for Environmental Health", 
@@ -507,14 +582,6 @@ def _parse_abstract_retrieval(abstract_entry):
     #            "Agency for Toxic Substances and Disease Registry", 
     #            "Office of Capacity Development and Applied Prevention Science", 
     #            "Office of Community Health and Hazard Assessment", "Office of Innovation and Analytics"]
-    author_name_str =""
-    affiliation_name_str=""
-    author_with_affiliation_str=""
-    first_author_affiliation=""
-    last_author_affiliation=""
-    affiliationdict={}
-    authordict={}
-    affiliation_name_list=[]
     user_defined_exception_list=[]
     system_exception_list=[]
 
@@ -522,288 +589,18 @@ def _parse_abstract_retrieval(abstract_entry):
     
     # coredata
     coredata = resp['coredata']
-    source = resp["item"]["bibrecord"]["head"]["source"]
-    authorgrouplistorsingle= resp["item"]["bibrecord"]["head"]["author-group"]
+    author_group = resp["item"]["bibrecord"]["head"]["author-group"]
     eid =coredata["eid"]
-    collaboration =""
 
     try:
-        # Author Group is list or single entity check 
-        if(isinstance(authorgrouplistorsingle, list)): 
-            # Author Group is list
-            for i in authorgrouplistorsingle:
-                if "collaboration" in i:
-                    if(len(collaboration)!=0 and collaboration[-2:] !=", "):
-                        collaboration =collaboration +", " 
-                    if "ce:indexed-name" in i["collaboration"]:
-                        collaboration = collaboration + i["collaboration"]["ce:indexed-name"]
-                    elif "ce:text" in i["collaboration"]:
-                        collaboration = collaboration + i["collaboration"]["ce:text"]
-                    continue    
-                if "affiliation" in i:
-                    affiliation = i["affiliation"]
-                    affiliation_text = ""
-                    if "ce:source-text" in affiliation:
-                        affiliation_text = affiliation["ce:source-text"]
-                    else:
-                        #affiliation_text = _parse_affiliation_from_authorgroup(affiliation)
-                        #print("ce:source-text is null for :"+ str(eid))
-                        if "organization" in affiliation:                
-                            organization = affiliation["organization"]
-                            if(isinstance(organization, list)):
-                                for l in organization:
-                                    tempOrgName = l["$"]
-                                    if(len(affiliation_text)!=0):
-                                        affiliation_text =affiliation_text +", "   
-                                    affiliation_text = affiliation_text + tempOrgName
-                            else:
-                                        affiliation_text = organization["$"]
-                                        #print("organization is null for :"+  str(eid))
-                            if "address-part" in affiliation:
-                                affiliation_text = affiliation_text + ", "+ affiliation["address-part"]
-                            if "city" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["city"]
-                            if "state" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["state"]
-                            if "postalcode" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["postalcode"]
-                            if "country" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["country"]        
-                        elif "ce:text" in affiliation:
-                            affiliation_text = affiliation["ce:text"]                      
-                        else:
-                            #affiliation_text = " "
-                            #print("organization and ce:text is null for :"+  str(eid))
-                            uException = "Affiliation organization/ce:source-text/ce:text not available for %s"%eid
-                            user_defined_exception_list.append(uException)  
-                else:
-                        #affiliation_text = " "
-                        if(len(collaboration)==0):
-                            uException = "Affiliation  not available for %s"%eid
-                            user_defined_exception_list.append(uException)              
-
-                if "author" in i:
-                    author_list = i["author"]
-                    if(isinstance(author_list, list)):
-                        for j in author_list:
-                            seqid = j["@seq"]
-                            author_text = j["ce:indexed-name"]
-                            authordict = {**authordict, seqid.lower(): author_text}
-                            if seqid.lower() in affiliationdict:
-                                templist = affiliationdict[seqid.lower()]  
-                                templist.append(affiliation_text)
-                                affiliationdict[seqid.lower()] = templist
-                            else:
-                                affiliationdict = {**affiliationdict, seqid.lower(): [affiliation_text]}
-                    else:
-                            seqid = author_list["@seq"]
-                            author_text = author_list["ce:indexed-name"]
-                            authordict = {**authordict, seqid.lower(): author_text}
-                            if seqid.lower() in affiliationdict:
-                                templist = affiliationdict[seqid.lower()]  
-                                templist.append(affiliation_text)
-                                affiliationdict[seqid.lower()] = templist
-                            else:
-                                affiliationdict = {**affiliationdict, seqid.lower(): [affiliation_text]}
-                else:
-                    if(len(collaboration)==0):
-                        #print("author is null for :"+  str(eid))
-                        uException = "Author not available for %s"%eid
-                        user_defined_exception_list.append(uException) 
-
-
-        else:
-            if "collaboration" in authorgrouplistorsingle:
-                    if(len(collaboration)!=0):
-                        collaboration =collaboration +", " 
-                    if "ce:indexed-name" in i["collaboration"]:
-                        collaboration = collaboration + i["collaboration"]["ce:indexed-name"]
-                    elif "ce:text" in i["collaboration"]:
-                        collaboration = collaboration + i["collaboration"]["ce:text"]
-            if "affiliation" in authorgrouplistorsingle:
-                affiliation = authorgrouplistorsingle["affiliation"]
-                affiliation_text = " "
-                if "ce:source-text" in affiliation:
-                        affiliation_text = affiliation["ce:source-text"]
-                else:
-                        #affiliation_text = _parse_affiliation_from_authorgroup(affiliation)
-                        #print("ce:source-text is null for :"+  str(eid))
-                        if "organization" in affiliation:                
-                            organization = affiliation["organization"]
-                            if(isinstance(organization, list)):
-                                for l in organization:
-                                    tempOrgName = l["$"]
-                                    if(len(affiliation_text)!=0):
-                                                affiliation_text =affiliation_text +", "   
-                                    affiliation_text = affiliation_text + tempOrgName
-                            else:
-                                        affiliation_text = organization["$"]
-                            if "address-part" in affiliation:
-                                affiliation_text = affiliation_text + ", "+ affiliation["address-part"]
-                            if "city" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["city"]
-                            if "state" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["state"]
-                            if "postalcode" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["postalcode"]
-                            if "country" in affiliation:
-                                    affiliation_text = affiliation_text + ", "+ affiliation["country"]  
-                        elif "ce:text" in affiliation:
-                            affiliation_text = affiliation["ce:text"]                      
-                        else:
-                            #affiliation_text = " "
-                            #print("organization and ce:text is null for :"+  str(eid))
-                            uException = "Affiliation organization/ce:source-text/ce:text not available for %s"%eid
-                            user_defined_exception_list.append(uException) 
-            else:
-                #affiliation_text = " "
-                if(len(collaboration)==0):
-                            uException = "Affiliation  not available for %s"%eid
-                            user_defined_exception_list.append(uException)                   
-            
-            if "author" in authorgrouplistorsingle:
-                author_list = authorgrouplistorsingle["author"]   
-                if(isinstance(author_list, list)):
-                    for j in author_list:
-                            seqid = j["@seq"]
-                            author_text = j["ce:indexed-name"]
-                            authordict = {**authordict, seqid.lower(): author_text}
-                            if seqid.lower() in affiliationdict:
-                                templist = affiliationdict[seqid.lower()]
-                                templist.append(affiliation_text)
-                                affiliationdict[seqid.lower()] = templist
-                            else:
-                                affiliationdict = {**affiliationdict, seqid.lower(): [affiliation_text]}
-                else:
-                            seqid = author_list["@seq"]
-                            author_text = author_list["ce:indexed-name"]
-                            authordict = {**authordict, seqid.lower(): author_text}
-                            if seqid.lower() in affiliationdict:
-                                templist = affiliationdict[seqid.lower()]  
-                                templist.append(affiliation_text)
-                                affiliationdict[seqid.lower()] = templist
-                            else:
-                                affiliationdict = {**affiliationdict, seqid.lower(): [affiliation_text]}
-            else:
-                if(len(collaboration)==0):
-                        #print("author is null for :"+  str(eid))
-                        uException = "Author not available for %s"%eid
-                        user_defined_exception_list.append(uException) 
-                
-                
-                    
-
+        authors = _assemble_authors(author_group, eid, user_defined_exception_list)
     except Exception as e:
-        #sException = traceback
         system_exception_list.append("Exception happened for %s"%eid)
         system_exception_list.append(e)
-        system_exception_list.append(traceback.stack()) 
-        #rint(e)
-        #traceback
-        #print("Exception happened for ")
-        #print(str(eid))
-        affiliationdict = None
-        authordict = None
-        author_name_str =None
-        affiliation_name_str=None
-        author_with_affiliation_str=None
-        first_author_affiliation = None
-        last_author_affiliation = None  
+        system_exception_list.append(traceback.format_exc())
+        authors = dict.fromkeys(('Authors', 'Affiliations', 'Authors with affiliations',
+                                 'HT_NCEHATSDR_Lead', 'HT_NCEHATSDR_Senior'))
 
-    try:
-        if(affiliationdict is not None and authordict is not None):
-            affiliationdict = collections.OrderedDict(sorted(affiliationdict.items()))
-            authordict = collections.OrderedDict(sorted(authordict.items()))
-    except Exception as e:
-        # print("Exception happened for ")
-        # print(str(eid))
-        # print(e)
-        system_exception_list.append("Exception happened for %s"%eid)
-        system_exception_list.append(e)
-        system_exception_list.append(traceback.stack()) 
-        #traceback.print_exc()
-     
-        affiliationdict = None
-        authordict = None 
-    
-    if(affiliationdict is not None and authordict is not None):
-        if (len(authordict) != len(affiliationdict)):
-            #print("There is mismatch between author and affiliation group")
-            uException = "There is mismatch between author and affiliation for %s"%eid
-            user_defined_exception_list.append(uException) 
-
-        
-        k = 1
-        while k <= len(authordict):
-            try:
-                    if(len(author_name_str)!=0 and author_name_str[-2:] !=", "):
-                            author_name_str = author_name_str + ", "
-                    if str(k).lower() in authordict and authordict[str(k).lower()] is not None:
-                        author_name_str = author_name_str + authordict[str(k).lower()]
-                    # if str(k).lower() in affiliationdict and affiliationdict[str(k).lower()] is not None: 
-                    #     affiliation_name_list.extend(affiliationdict[str(k).lower()])
-                    if(len(author_with_affiliation_str)!=0 and author_with_affiliation_str[-2:] !="; "):
-                            author_with_affiliation_str =author_with_affiliation_str +"; "
-                    if str(k).lower() in authordict and authordict[str(k).lower()] is not None and str(k).lower() in affiliationdict and affiliationdict[str(k).lower()] is not None:        
-                        author_with_affiliation_str = author_with_affiliation_str + authordict[str(k).lower()] +', '+ ', '.join(affiliationdict[str(k).lower()])
-                    else:
-                        #author_with_affiliation_str = author_with_affiliation_str +", "+ ', '.join(affiliationdict[str(k.lower())])
-                        uException = "For Seq ID %s, Author and Affiliation didn't Match. EID is  %s" %(str(k).lower(),eid)
-                        user_defined_exception_list.append(uException)     
-                    if k==1:
-                        if str(k).lower() in affiliationdict and affiliationdict[str(k).lower()] is not None:
-                            first_author_affiliation = ', '.join(affiliationdict[str(k).lower()])
-                        else:
-                            uException = "First Author and Affiliation didn't Match. EID is  %s" %eid
-                            user_defined_exception_list.append(uException) 
-                    if k==len(authordict):
-                        if str(k).lower() in affiliationdict and affiliationdict[str(k).lower()] is not None:
-                            last_author_affiliation = ', '.join(affiliationdict[str(k).lower()])
-                        else:
-                            uException = "Last Author and Affiliation didn't Match. EID is  %s" %eid
-                            user_defined_exception_list.append(uException) 
-                    k=k+1
-            except Exception as e:
-                    system_exception_list.append("Exception happened for %s"%eid)
-                    system_exception_list.append(e)
-                    system_exception_list.append(traceback.stack()) 
-                    author_name_str =None
-                    affiliation_name_str=None
-                    author_with_affiliation_str=None
-                    first_author_affiliation = None
-                    last_author_affiliation = None
-                    pass
-
-            
-        try:
-            temp = []
-            deduplicated_affiliationdict = dict()
-            for key, val in affiliationdict.items():
-                if isinstance(val,list):
-                    for idx, x in enumerate(val):
-                        if x not in temp:
-                            temp.append(x)
-                            deduplicated_affiliationdict[int(key)+1000+idx] = x
-                else:
-                    if val not in temp:
-                        temp.append(val)
-                        deduplicated_affiliationdict[key] = val
-            # affiliation_name_list = set(affiliation_name_list)
-            # affiliation_name_list = list(affiliation_name_list)[::-1]
-            affiliation_name_list = deduplicated_affiliationdict.values()
-            affiliation_name_str = '; '.join(affiliation_name_list) 
-            if len(collaboration)!=0 and author_with_affiliation_str is not None:
-                author_with_affiliation_str = author_with_affiliation_str +"; "+ collaboration
-        except Exception as e:
-            # print("Exception happened for ")
-            # print(str(eid))
-            # print(e)
-            # traceback.print_exc()
-            system_exception_list.append("Exception happened for %s"%eid)
-            system_exception_list.append(e)
-            system_exception_list.append(traceback.stack()) 
-   
- 
     # try:
     #     if first_author_affiliation.split(',')[0] in nceh_affiliations:
     #         NCEH_ATSDR_FIRST = "Yes"
@@ -848,43 +645,7 @@ def _parse_abstract_retrieval(abstract_entry):
     #     LAST_AUTHOR_DIVISION = None 
 
 
-    try:
-        abbreviated_source_title = source["sourcetitle-abbrev"]
-    except:
-        abbreviated_source_title = None
-
-    try:
-        coden = source["codencode"]
-    except:
-        coden = None    
-
-    try:
-        author_keywords = ""
-        #authorKeywordsList = ""
-        citation_info = resp["item"]["bibrecord"]["head"]["citation-info"]
-        if "author-keywords" in citation_info: 
-            authorKeywords = citation_info["author-keywords"]
-            if "author-keyword" in authorKeywords:
-                authorKeywordsList = authorKeywords["author-keyword"]
-                if(isinstance(authorKeywordsList, list)):
-                        for i in authorKeywordsList:
-                            temp = i["$"]
-                            if(len(author_keywords) != 0):
-                                author_keywords = author_keywords +'; '
-                            author_keywords = author_keywords+temp
-                else:
-                    if "$" in authorKeywordsList:
-                        author_keywords = authorKeywordsList["$"]
-
-    except Exception as e: 
-        # print("Exception happened for ")
-        # print(str(eid))
-        # print(e)
-        # traceback.print_exc()
-        system_exception_list.append("Exception happened for %s"%eid)
-        system_exception_list.append(e)
-        system_exception_list.append(traceback.stack()) 
-        author_keywords = None
+    head_fields = _ABSTRACT_HEAD_SCHEMA(resp["item"]["bibrecord"]["head"])
     # keys to exclude
     unwanted_keys = ('dc:identifier','dc:creator','pii','article-number','link','srctype','eid','pubmed-id','prism:coverDate','prism:aggregationType','prism:url',
                      'source-id','citedby-count','prism:volume','subtype','openaccess','prism:issn','prism:isbn',
@@ -913,15 +674,9 @@ def _parse_abstract_retrieval(abstract_entry):
 
     
     abstract_dict['Abstract Retrieval Title'] = abstract_dict.pop('dc:title')
-    abstract_dict['Abbreviated Source Title'] = abbreviated_source_title
-    abstract_dict['CODEN'] = coden
-    abstract_dict['Author Keywords'] = author_keywords
+    abstract_dict.update(head_fields)
     abstract_dict['Source_Title'] = abstract_dict.pop('prism:publicationName')
-    abstract_dict['Authors'] = author_name_str
-    abstract_dict['Affiliations'] = affiliation_name_str
-    abstract_dict['Authors with affiliations'] = author_with_affiliation_str
-    abstract_dict['HT_NCEHATSDR_Lead'] = first_author_affiliation
-    abstract_dict['HT_NCEHATSDR_Senior'] = last_author_affiliation
+    abstract_dict.update(authors)
     # abstract_dict['NCEH_ATSDR_FIRST'] = NCEH_ATSDR_FIRST
     # abstract_dict['NCEH_ATSDR_LAST'] = NCEH_ATSDR_LAST
     # abstract_dict['FIRST_AUTHOR_DIVISION'] = FIRST_AUTHOR_DIVISION
@@ -932,7 +687,78 @@ def _parse_abstract_retrieval(abstract_entry):
     return abstract_dict
 
 
-def _search_scopus(key, query, type_, view, index=0):
+def _fetch_json(url, params):
+    '''
+        Default fetch function: a plain one-off requests.get, decoded as JSON
+    '''
+    return requests.get(url, params=params).json()
+
+def _search_request(key, query, type_, view, index=0, cursor=None):
+    '''
+        URL and parameters of one search request (see _search_scopus for the arguments)
+    '''
+    par = {'apikey': key, 'query': query, 'start': index,
+           'httpAccept': 'application/json', 'view': view}
+    if cursor is not None:
+        del par['start']
+        par['cursor'] = cursor
+    if type_ == 'article' or type_ == 1:
+        return APIURI.SEARCH, par
+    else:
+        par['view'] = 'STANDARD'
+        return APIURI.SEARCH_AUTHOR, par
+
+def _search_archive_key(query, type_, index=0, cursor=None):
+    '''
+        (kind, id) a search page is archived under: 'search' (document search,
+        see pyscopus.replay) or 'author_search', and '<query>|<start or cursor>'
+    '''
+    kind = 'search' if type_ == 'article' or type_ == 1 else 'author_search'
+    return kind, '%s|%s' %(query, cursor if cursor is not None else index)
+
+def _parse_search_page(js, type_, links=False):
+    '''
+        Parse a decoded search response into (list of records, total count, next cursor or None)
+        With links, the records are (record, _parse_article_links(entry)) pairs.
+    '''
+    total_count = int(js['search-results']['opensearch:totalResults'])
+    entries = js['search-results']['entry']
+    if links:
+        record_list = [(_parse_entry(entry, type_), _parse_article_links(entry))
+                       for entry in entries]
+    else:
+        record_list = [_parse_entry(entry, type_) for entry in entries]
+    try:
+        next_cursor = js['search-results']['cursor']['@next']
+    except KeyError:
+        next_cursor = None
+    return record_list, total_count, next_cursor
+
+def _search_scopus_page(key, query, type_, view, index=0, fetch=None, cursor=None, links=False,
+                        archive=False):
+    '''
+        Fetch one page of search results and parse its entries into records,
+        without building a data frame (see _search_scopus for the parameters).
+        With archive, fetch is passed the archive key of the page as well
+        (see _search_archive_key).
+
+        Returns
+        -------
+        tuple
+            (list of parsed entries, total count, next cursor or None)
+    '''
+
+    if fetch is None:
+        fetch = _fetch_json
+
+    url, par = _search_request(key, query, type_, view, index=index, cursor=cursor)
+    if archive:
+        js = fetch(url, par, _search_archive_key(query, type_, index=index, cursor=cursor))
+    else:
+        js = fetch(url, par)
+    return _parse_search_page(js, type_, links=links)
+
+def _search_scopus(key, query, type_, view, index=0, fetch=None, cursor=None):
     '''
         Search Scopus database using key as api key, with query.
         Search author or articles depending on type_
@@ -949,26 +775,28 @@ def _search_scopus(key, query, type_, view, index=0):
             Returned result view (i.e., return fields). Can only be STANDARD for author search.
         index : int
             Start index. Will be used in search_scopus_plus function
+        fetch : callable
+            fetch(url, params) returning the decoded JSON response.
+            Scopus passes its own pooled transport here; defaults to requests.get.
+        cursor : string
+            Cursor for deep pagination ('*' for the first page), used instead of index.
+            Only supported by document search.
 
         Returns
         -------
         pandas DataFrame
+            Along with the total count if index is 0, or with the total count and the
+            next cursor if cursor is given.
     '''
 
-    par = {'apikey': key, 'query': query, 'start': index,
-           'httpAccept': 'application/json', 'view': view}
-    if type_ == 'article' or type_ == 1:
-        r = requests.get(APIURI.SEARCH, params=par)
-    else:
-        par['view'] = 'STANDARD'
-        r = requests.get(APIURI.SEARCH_AUTHOR, params=par)
-
-    js = r.json()
-    total_count = int(js['search-results']['opensearch:totalResults'])
-    entries = js['search-results']['entry']
-    result_df = pd.DataFrame([_parse_entry(entry, type_) for entry in entries])
+    record_list, total_count, next_cursor = _search_scopus_page(key, query, type_, view,
+                                                                index=index, fetch=fetch,
+                                                                cursor=cursor)
+    result_df = _RecordColumns(record_list).to_frame()
 
-    if index == 0:
+    if cursor is not None:
+        return(result_df, total_count, next_cursor)
+    elif index == 0:
         return(result_df, total_count)
     else:
         return(result_df)